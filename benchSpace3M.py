@@ -0,0 +1,174 @@
+#==============================================================================
+# :main file Benchmark of the Space3M compute pipeline
+#------------------------------------------------------------------------------
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from siqo_lib      import journal
+from space3M       import Space3M, _PLOT_COLUMNS
+from partMassLess  import PartMassLess
+
+#==============================================================================
+# package's constants
+#------------------------------------------------------------------------------
+_SHAPE  = {'xMin':-30, 'xMax':30, 'yMin':-10, 'yMax':50, 'zMin':0, 'zMax':1, 'tMin':-20, 'tMax':50 }
+_MPG    = 0.05    # Meters per grid of the main2Photons scenarios
+_LAMBDA = 0.55    # Wave length of photons in the main2Photons scenarios
+_POS_X  = 0.86    # Photons are spread over x in <-_POS_X, _POS_X> as in main2Photons
+_IDS    = 10000   # Number of IDs parsed in getIdStruct stage
+
+#==============================================================================
+# package's tools
+#------------------------------------------------------------------------------
+def scaleShape(scale):
+    "Return main2Photons shape with grid scaled by scale, real extent of the space stays the same"
+
+    # Every dimension keeps at least one grid point
+    toret = {}
+    for dim in 'xyzt':
+        mn = int(round(_SHAPE[dim+'Min'] * scale))
+        mx = int(round(_SHAPE[dim+'Max'] * scale))
+        toret[dim+'Min'] = mn
+        toret[dim+'Max'] = max(mx, mn+1)
+
+    return toret
+
+#------------------------------------------------------------------------------
+def getParts(count):
+    "Return list of count photons spread over x axis"
+
+    toret = []
+    for i, x in enumerate(np.linspace(-_POS_X, _POS_X, count) if count > 1 else [0.0]):
+        part = PartMassLess( 'p{}'.format(i+1), {'x':float(x), 'y':0, 'z':0, 't':0} )
+        part.setLambda(_LAMBDA)
+        toret.append(part)
+
+    return toret
+
+#------------------------------------------------------------------------------
+def runStage(func):
+    "Run func and return (wall seconds, peak traced bytes) of the run"
+
+    # tracemalloc sees heap allocations of this process only, memory of partsUp worker processes and
+    # shared memory blocks holding amplitudes of RAM spaces are not included
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+
+    t0 = time.perf_counter()
+    func()
+    dt = time.perf_counter() - t0
+
+    return (dt, tracemalloc.get_traced_memory()[1] - base)
+
+#------------------------------------------------------------------------------
+def benchCase(scale, count, repeat, memBudget, workers):
+    "Return list of stage records for one grid scale and particle count, best wall time of repeat runs"
+
+    shape = scaleShape(scale)
+    mpg   = _MPG / scale
+    parts = getParts(count)
+    st    = Space3M('Bench')
+    cells = 0
+    best  = {}
+
+    def createSpace():
+        st.createSpace(shape, mpg, memBudget=memBudget)
+        for part in parts: st.addPart(part)
+
+    def partsUp():
+        st.partsUp(workers=workers)
+
+    def getPlotData():
+        data = st.getPlotData()['data']
+        for key in _PLOT_COLUMNS: data[key]
+
+    def getIdStruct():
+        for id in ids: st.getIdStruct(id)
+
+    for i in range(repeat):
+
+        stages = [('createSpace', createSpace), ('partsUp', partsUp), ('getPlotData', getPlotData)]
+
+        for (stage, func) in stages:
+            rec = runStage(func)
+            if stage not in best or rec[0] < best[stage][0]: best[stage] = rec
+
+        # IDs are prepared outside of measured time
+        cells = int(np.prod(st.getDims()))
+        ids   = [st.getIdFromIdx(idx) for idx in np.linspace(0, cells-1, min(_IDS, cells)).astype(int)]
+
+        rec = runStage(getIdStruct)
+        if 'getIdStruct' not in best or rec[0] < best['getIdStruct'][0]: best['getIdStruct'] = rec
+
+    toret = []
+    for (stage, (dt, peak)) in best.items():
+
+        # Units processed by the stage are cells except of getIdStruct parsing IDs
+        units = len(ids) if stage == 'getIdStruct' else cells
+
+        toret.append( {'scale':scale, 'parts':count, 'dims':list(st.getDims()), 'cells':cells, 'stage':stage, 'units':units,
+                       'sec':dt, 'unitsPerSec':units/dt if dt > 0 else None, 'peakBytes':peak} )
+
+    return toret
+
+#------------------------------------------------------------------------------
+def compare(results, path):
+    "Print speedup of results against results stored in JSON file path"
+
+    with open(path) as f: old = json.load(f)
+
+    oldSec = { (r['scale'], r['parts'], r['stage']): r['sec'] for r in old['results'] }
+
+    print( '{:>6} {:>6} {:<12} {:>10} {:>10} {:>8}'.format('scale', 'parts', 'stage', 'old s', 'new s', 'speedup') )
+    for r in results:
+        key = (r['scale'], r['parts'], r['stage'])
+        if key in oldSec:
+            print( '{:>6} {:>6} {:<12} {:>10.4f} {:>10.4f} {:>8.2f}'.format(r['scale'], r['parts'], r['stage'],
+                    oldSec[key], r['sec'], oldSec[key]/r['sec'] if r['sec'] > 0 else float('nan')) )
+
+#==============================================================================
+# Functions
+#------------------------------------------------------------------------------
+#------------------------------------------------------------------------------
+#------------------------------------------------------------------------------
+if __name__ =='__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark of Space3M createSpace, partsUp, getPlotData and getIdStruct')
+    parser.add_argument('--scales'   , type=float, nargs='+', default=[0.5, 1.0, 2.0], help='grid scales of the main2Photons shape')
+    parser.add_argument('--parts'    , type=int  , nargs='+', default=[1, 2, 4]      , help='particle counts')
+    parser.add_argument('--repeat'   , type=int  , default=3                         , help='runs per case, the best one is reported')
+    parser.add_argument('--memBudget', type=int  , default=0                         , help='memory budget for tiled partsUp in bytes')
+    parser.add_argument('--workers'  , type=int  , default=1                         , help='worker processes for partsUp, peak memory excludes workers')
+    parser.add_argument('--out'      , default='benchSpace3M.json'                   , help='JSON file for results')
+    parser.add_argument('--compare'  , default=None                                  , help='JSON file of older results to compare with')
+    parser.add_argument('--tag'      , default=''                                    , help='label of the measured version')
+    args = parser.parse_args()
+
+    journal.setLevel(0)
+    tracemalloc.start()
+
+    results = []
+    for scale in args.scales:
+        for count in args.parts:
+            for r in benchCase(scale, count, args.repeat, args.memBudget, args.workers):
+                print( '{scale:>6} {parts:>6} {stage:<12} {units:>10} units {sec:>10.4f} s {unitsPerSec:>14.0f} /s {peakBytes:>12} B'.format(**r) )
+                results.append(r)
+
+    tracemalloc.stop()
+
+    out = {'tag':args.tag, 'time':time.strftime('%Y-%m-%d %H:%M:%S'), 'python':platform.python_version(),
+           'numpy':np.__version__, 'machine':platform.machine(), 'args':vars(args), 'results':results}
+
+    with open(args.out, 'w') as f: json.dump(out, f, indent=1)
+    print( 'Results written into {}'.format(args.out) )
+
+    if args.compare is not None: compare(results, args.compare)
+
+#==============================================================================
+#                              END OF FILE
+#------------------------------------------------------------------------------
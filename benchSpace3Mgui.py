@@ -0,0 +1,112 @@
+#==============================================================================
+# :main file Benchmark of the Space3Mgui render latency on headless Agg canvas
+#------------------------------------------------------------------------------
+import argparse
+import json
+import platform
+import time
+
+import numpy      as np
+import matplotlib
+
+from siqo_lib      import journal
+from space3M       import Space3M
+from space3Mgui    import Space3Mgui, _CACHE_MEM
+from benchSpace3M  import scaleShape, getParts, _MPG
+
+#==============================================================================
+# package's constants
+#------------------------------------------------------------------------------
+_VAL_X  = 1     # x on horizontal axis
+_VAL_Y  = 2     # y on vertical axis, slider moves along t
+_VAL_U  = (13, 10)  # abAmR and abAmN are switched in value switch frames
+_VAL_V  = 9     # imAmN
+
+#==============================================================================
+# package's tools
+#------------------------------------------------------------------------------
+def timeFrame(gui, **view):
+    "Return seconds needed by gui to show the view"
+
+    t0 = time.perf_counter()
+    gui.setView(**view)
+    return time.perf_counter() - t0
+
+#------------------------------------------------------------------------------
+def stats(ts):
+    "Return dictionary of frame time statistics in milliseconds"
+
+    ms = np.array(ts) * 1e3
+    return {'frames':len(ts), 'meanMs':float(ms.mean()), 'medianMs':float(np.median(ms)),
+            'p95Ms':float(np.percentile(ms, 95)), 'maxMs':float(ms.max())}
+
+#------------------------------------------------------------------------------
+def benchGui(gui, axe, frames):
+    "Return list of frame records for chart kind axe: build, slider moves and value switches"
+
+    toret = []
+
+    # Chart is built from scratch when chart kind changes
+    build = timeFrame(gui, axe=axe, valX=_VAL_X, valY=_VAL_Y, valU=_VAL_U[0], valV=_VAL_V, sVal=0)
+    n     = gui.chart['n']
+
+    key  = gui.values[gui.actValS]
+    vals = np.arange(gui.space3M.shapeMin(key), gui.space3M.shapeMax(key))
+    vals = vals[np.linspace(0, len(vals)-1, min(frames, len(vals))).astype(int)]
+
+    slider = [timeFrame(gui, sVal=int(s)) for s in vals]
+    switch = [timeFrame(gui, valU=_VAL_U[(i+1) % 2]) for i in range(frames)]
+
+    for (event, ts) in (('build', [build]), ('slider', slider), ('switch', switch)):
+        rec = {'axe':axe, 'chart':gui.axes[axe], 'event':event, 'sliceSize':n}
+        rec.update(stats(ts))
+        toret.append(rec)
+
+    return toret
+
+#==============================================================================
+# Functions
+#------------------------------------------------------------------------------
+#------------------------------------------------------------------------------
+#------------------------------------------------------------------------------
+if __name__ =='__main__':
+
+    parser = argparse.ArgumentParser(description='Headless benchmark of Space3Mgui time per frame for all chart kinds')
+    parser.add_argument('--scales'  , type=float, nargs='+', default=[0.5, 1.0, 2.0], help='grid scales of the main2Photons shape')
+    parser.add_argument('--axes'    , type=int  , nargs='+', default=[1, 2, 3, 4, 5] , help='chart kinds, keys of Space3Mgui.axes')
+    parser.add_argument('--frames'  , type=int  , default=20                         , help='slider moves and value switches per chart')
+    parser.add_argument('--cacheMem', type=float, default=_CACHE_MEM                 , help='memory cap of slice cache in bytes')
+    parser.add_argument('--out'     , default='benchSpace3Mgui.json'                 , help='JSON file for results')
+    parser.add_argument('--tag'     , default=''                                     , help='label of the measured version')
+    args = parser.parse_args()
+
+    journal.setLevel(0)
+
+    results = []
+    for scale in args.scales:
+
+        st = Space3M('Bench')
+        st.createSpace(scaleShape(scale), _MPG / scale)
+        for part in getParts(2): st.addPart(part)
+        st.partsUp()
+
+        gui = Space3Mgui(st, cacheMem=args.cacheMem, headless=True)
+
+        for axe in args.axes:
+            for r in benchGui(gui, axe, args.frames):
+                r['scale'] = scale
+                print( '{scale:>6} {chart:<14} {event:<7} {sliceSize:>9} points {medianMs:>9.2f} ms median {p95Ms:>9.2f} ms p95'.format(**r) )
+                results.append(r)
+
+        gui.prefetcher.shutdown()
+
+    out = {'tag':args.tag, 'time':time.strftime('%Y-%m-%d %H:%M:%S'), 'python':platform.python_version(),
+           'numpy':np.__version__, 'matplotlib':matplotlib.__version__, 'machine':platform.machine(),
+           'args':vars(args), 'results':results}
+
+    with open(args.out, 'w') as f: json.dump(out, f, indent=1)
+    print( 'Results written into {}'.format(args.out) )
+
+#==============================================================================
+#                              END OF FILE
+#------------------------------------------------------------------------------
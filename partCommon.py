@@ -36,20 +36,21 @@ class PartCommon(ABC):
     def __init__(self, name, pos, eV):
         "Call constructor of PartCommon and initialise it"
 
-        journal.I( 'PartCommon constructor for {}...'.format(name), 10 )
+        journal.I( 'PartCommon constructor for {}...', 10, name)
         
         self.name     = name      # unique name for particle in Your project
         self.type     = 'common'  # type of particle, used in inherited classes
         self.pos      = pos       # position of probability density amplitude origin
-        self.eV       = eV        # energy of article in [eV]
+        self.wave     = {}        # memoized wave properties, cleared when energy changes
+        self.setEV(eV)            # energy of article in [eV]
 
-        journal.O( 'PartCommon {} created with {:e} eV'.format(self.name, self.eV), 10 )
+        journal.O( 'PartCommon {} created with {:e} eV', 10, self.name, self.eV)
 
     #--------------------------------------------------------------------------
     def clear(self):
         "Clear all data content and set default transformation parameters"
 
-        journal.M( 'PartCommon {} ALL cleared'.format(self.name), 10)
+        journal.M( 'PartCommon {} ALL cleared', 10, self.name)
         
     #==========================================================================
     # Tools for particle's selecting & editing
@@ -70,12 +71,13 @@ class PartCommon(ABC):
         "Set total energy in [eV]"
         
         self.eV = eV
+        self.wave.clear()
 
     #--------------------------------------------------------------------------
     def setLambda(self, lam):
         "Set total energy in [eV] for given lambda in [m], E = h * c / lambda * coeff"
         
-        self.eV = _H * _C / lam / _EV_J
+        self.setEV( _H * _C / lam / _EV_J )
 
     #==========================================================================
     # Physical properties of common particle
@@ -115,25 +117,29 @@ class PartCommon(ABC):
     def getFreq(self):
         "Return frequency in [Hz], f = E / h "
         
-        return self.getEJ() / _H
+        if 'freq' not in self.wave: self.wave['freq'] = self.getEJ() / _H
+        return self.wave['freq']
         
     #--------------------------------------------------------------------------
     def getOmega(self):
         "Return frequency in [rad/s], omega = 2Pi * f"
         
-        return _2PI * self.getFreq()
+        if 'omega' not in self.wave: self.wave['omega'] = _2PI * self.getFreq()
+        return self.wave['omega']
         
     #--------------------------------------------------------------------------
     def getLambda(self):
         "Return wavelength in [m], lambda = c/f"
         
-        return _C / self.getFreq()
+        if 'lambda' not in self.wave: self.wave['lambda'] = _C / self.getFreq()
+        return self.wave['lambda']
     
     #--------------------------------------------------------------------------
     def getWaveNum(self):
         "Return wave number in [2Pi/m], k = 2Pi / lambda"
         
-        return _2PI / self.getLambda()
+        if 'waveNum' not in self.wave: self.wave['waveNum'] = _2PI / self.getLambda()
+        return self.wave['waveNum']
     
     #--------------------------------------------------------------------------
     def getWaveVec(self):
@@ -151,23 +157,38 @@ class PartCommon(ABC):
     #==========================================================================
     # Tools for Space 
     #--------------------------------------------------------------------------
+    def getPhiPars(self):
+        "Return dictionary of particle's parameters of the phase law, PartSet stacks them into arrays"
+        
+        return {'omega':self.getOmega()}
+
+    #--------------------------------------------------------------------------
+    @classmethod
     @abstractmethod
-    def getPhi(self, dPos):
-        "Return angle Phi for particle and given interval in Minkowski space"
+    def getPhiArr(cls, pars, dt, dr, dx=None, dy=None, dz=None):
+        "Return array of angles Phi for parameters of the phase law and broadcastable numpy arrays of intervals"
         
         # THIS MUST BE RE-DEFINED IN INHERITED CLASS !
+        # pars       - dictionary from getPhiPars(), values are scalars or arrays broadcastable with intervals
+        # dx, dy, dz - direction components of the interval for phase laws depending on direction
         
         return 1/0
 
+    #--------------------------------------------------------------------------
+    def getPhi(self, dPos):
+        "Return angle Phi for particle and given interval in Minkowski space, values of dPos may be numpy arrays"
+        
+        return self.getPhiArr( self.getPhiPars(), dPos['dt'], dPos['dr'], dPos.get('dx'), dPos.get('dy'), dPos.get('dz') )
+
     #==========================================================================
     # Tools for data extraction & persistency
     #--------------------------------------------------------------------------
     def getJson(self):
         "Create and return Json record for particle"
         
-        json = {'name':self.name, 'type':self.type, 'eV':self.eV}
+        json = {'name':self.name, 'type':self.type, 'pos':self.pos, 'eV':self.eV}
         
-        journal.M( 'PartCommon {} getJson created'.format(self.name), 10)
+        journal.M( 'PartCommon {} getJson created', 10, self.name)
         
         return json
         
@@ -186,7 +207,7 @@ class PartCommon(ABC):
         print( "=======================================================================" )
         
 #------------------------------------------------------------------------------
-print('PartCommon class ver 0.20')
+print('PartCommon class ver 0.22')
 #==============================================================================
 #                              END OF FILE
 #------------------------------------------------------------------------------
@@ -36,18 +36,18 @@ class PartMassLess(PartCommon):
     def __init__(self, name, pos, eV=1):
         "Call constructor of PartMassLess and initialise it"
 
-        journal.I( 'PartMassLess constructor for {}...'.format(name), 10 )
+        journal.I( 'PartMassLess constructor for {}...', 10, name)
         
         super().__init__(name, pos, eV)
         self.type = 'MassLess'
         
-        journal.O( 'PartMassLess {} created'.format(self.name), 10 )
+        journal.O( 'PartMassLess {} created', 10, self.name)
 
     #--------------------------------------------------------------------------
     def clear(self):
         "Clear all data content and set default transformation parameters"
 
-        journal.M( 'PartMassLess {} ALL cleared'.format(self.name), 10)
+        journal.M( 'PartMassLess {} ALL cleared', 10, self.name)
         
     #==========================================================================
     # Tools for particle's selecting & editing
@@ -56,12 +56,13 @@ class PartMassLess(PartCommon):
     #==========================================================================
     # Tools for Space 
     #--------------------------------------------------------------------------
-    def getPhi(self, dPos):
-        "Return angle Phi for particle and given interval in Minkowski space"
+    @classmethod
+    def getPhiArr(cls, pars, dt, dr, dx=None, dy=None, dz=None):
+        "Return array of angles Phi = omega * (dt - dr/c) for parameters of the phase law and arrays of intervals"
         
-        rdt = dPos['dt'] - dPos['dr'] / _C
+        rdt = dt - dr / _C
         
-        return self.getOmega() * rdt
+        return pars['omega'] * rdt
 
     #==========================================================================
     # Tools for data extraction & persistency
@@ -71,7 +72,7 @@ class PartMassLess(PartCommon):
         
         json = super().getJson()
         
-        journal.M( 'PartMassLess {} getJson created'.format(self.name), 10)
+        journal.M( 'PartMassLess {} getJson created', 10, self.name)
         
         return json
         
@@ -84,7 +85,7 @@ class PartMassLess(PartCommon):
         return toret
         
 #------------------------------------------------------------------------------
-print('PartMassLess class ver 0.11')
+print('PartMassLess class ver 0.12')
 #==============================================================================
 #                              END OF FILE
 #------------------------------------------------------------------------------
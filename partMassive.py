@@ -36,7 +36,7 @@ class PartMassive:
     def __init__(self, name, massLess, m, v):
         "Call constructor of Particle3M and initialise it"
 
-        journal.I( 'Particle3M constructor for {}...'.format(name), 10 )
+        journal.I( 'Particle3M constructor for {}...', 10, name)
         
         self.name     = name      # unique name for particle in Your project
         self.type     = 'common'  # type of particle, used in inherited classes
@@ -46,13 +46,13 @@ class PartMassive:
         
         self.pos  = {'x':0, 'y':0, 'z':0, 't':0}     # Default position
 
-        journal.O( 'Particle3M {} created'.format(self.name), 10 )
+        journal.O( 'Particle3M {} created', 10, self.name)
 
     #--------------------------------------------------------------------------
     def clear(self):
         "Clear all data content and set default transformation parameters"
 
-        journal.M( 'Particle3M {} ALL cleared'.format(self.name), 10)
+        journal.M( 'Particle3M {} ALL cleared', 10, self.name)
         
     #==========================================================================
     # Tools for particle's selecting & editing
@@ -145,7 +145,7 @@ class PartMassive:
             if self.massLess : return self.getMass()
             else             : return self.getMass() / sqrt( 1 - self.getAbsV2()/_C2 )
         except:
-            journal.M( 'Particle3M {} getMassR is not defined'.format(self.name), 9)
+            journal.M( 'Particle3M {} getMassR is not defined', 9, self.name)
             return _ERR
     
     #--------------------------------------------------------------------------
@@ -197,7 +197,7 @@ class PartMassive:
     def toSpace(self, space, pos='nil'):
         "Write particle to Minkowski space"
         
-        journal.I( 'Particle3M {} toSpace...'.format(self.name), 10)
+        journal.I( 'Particle3M {} toSpace...', 10, self.name)
         
         if pos!='nil': self.pos = pos
         
@@ -210,7 +210,7 @@ class PartMassive:
             
 
         
-        journal.O( 'Particle3M {} toSpace done'.format(self.name), 10)
+        journal.O( 'Particle3M {} toSpace done', 10, self.name)
 
     #==========================================================================
     # Tools for data extraction & persistency
@@ -220,7 +220,7 @@ class PartMassive:
         
         json = {'name':self.name, 'type':self.type, 'm':self.m, 'v':self.v, ' pos':self.pos}
         
-        journal.M( 'Particle3M {} getJson created'.format(self.name), 10)
+        journal.M( 'Particle3M {} getJson created', 10, self.name)
         
         return json
         
@@ -0,0 +1,146 @@
+#==============================================================================
+# Set of particles in Minkowski space class
+#------------------------------------------------------------------------------
+#
+#    real position is given in meters for x,z,y and nanosecenods for t as real values
+#    grid position means position in numpy-like 4D array as integers 0..ix, 0..iy, 0..iz, 0..it
+#
+#    phi means argument (omega*t - k*x) as real value in radians
+#
+#------------------------------------------------------------------------------
+from siqo_lib      import journal
+from iuniverse_lib import _C2
+
+import numpy       as np
+
+#==============================================================================
+# package's constants
+#------------------------------------------------------------------------------
+
+#==============================================================================
+# package's tools
+#------------------------------------------------------------------------------
+def waveToAmp(cos, sin, r, out=None):
+    "Return complex amplitude cos/r + i*sin/r written into out, new array if out is None"
+
+    if out is None: out = np.empty(np.broadcast_shapes(cos.shape, r.shape), dtype=np.complex128)
+
+    # Quotients are written straight into real and imaginary parts, no complex temporaries
+    np.divide(cos, r, out=out.real)
+    np.divide(sin, r, out=out.imag)
+
+    return out
+
+#==============================================================================
+# class PartSet
+#------------------------------------------------------------------------------
+class PartSet:
+
+    #==========================================================================
+    # Constructor & utilities
+    #--------------------------------------------------------------------------
+    def __init__(self, parts):
+        "Call constructor of PartSet and initialise arrays of positions and phase law parameters from list of particles"
+
+        journal.I( 'PartSet constructor for {} particles...', 10, len(parts))
+
+        self.names   = [part.getName() for part in parts]
+        self.classes = [type(part)     for part in parts]   # phase law getPhiArr is taken from particle's class
+
+        # Arrays with particle axis first, pos columns are x, y, z, t
+        self.pos   = np.array([[part.getPos()[k] for k in 'xyzt'] for part in parts], dtype=np.float64).reshape(-1, 4)
+
+        # Parameters of phase laws, NaN for particles whose class does not use the parameter
+        pars      = [part.getPhiPars() for part in parts]
+        self.pars = {}
+        for (i, par) in enumerate(pars):
+            for (key, val) in par.items():
+                if key not in self.pars: self.pars[key] = np.full(len(parts), np.nan)
+                self.pars[key][i] = val
+
+        journal.O( 'PartSet created with {} particles', 10, len(self))
+
+    #--------------------------------------------------------------------------
+    def __len__(self):
+
+        return len(self.names)
+
+    #==========================================================================
+    # Tools for Space
+    #--------------------------------------------------------------------------
+    def getChunks(self, size):
+        "Return list of slices splitting particles into chunks of at most size particles of the same class"
+
+        size  = max(1, int(size))
+        toret = []
+        start = 0
+
+        for i in range(1, len(self)+1):
+            if i == len(self) or i - start == size or self.classes[i] is not self.classes[start]:
+                toret.append( slice(start, i) )
+                start = i
+
+        return toret
+
+    #--------------------------------------------------------------------------
+    def getWaves(self, x, y, z, t, chunk=slice(None)):
+        "Return (cos, sin, rN, rR) arrays with leading particle axis for chunk of particles and real positions x, y, z, t, amplitudes are cos/r + i*sin/r"
+
+        # Particle axis is prepended to broadcastable position vectors of any dimension
+        pos   = self.pos[chunk]
+        shape = (-1,) + (1,) * max(np.ndim(v) for v in (x, y, z, t))
+
+        # Interval between particles and cells as in Space3M.getPosInt
+        dx  = x - pos[:, 0].reshape(shape)
+        dy  = y - pos[:, 1].reshape(shape)
+        dz  = z - pos[:, 2].reshape(shape)
+        dt  = t - pos[:, 3].reshape(shape)
+
+        # dr lives on spatial axes only, aDt is the first full size array and is clamped in place
+        dr2 = dx*dx + dy*dy + dz*dz
+        dr  = np.sqrt(dr2)
+        aDt = dt*dt - dr2/_C2
+        np.sqrt(np.abs(aDt, out=aDt), out=aDt)
+
+        rN  = np.maximum(dr,  1e-1)
+        rR  = np.maximum(aDt, 1e-9, out=aDt)
+
+        # Chunk holds particles of one class, its phase law gets parameters as arrays over particle axis
+        cls  = self.classes[chunk][0]
+        pars = { key:val[chunk].reshape(shape) for (key, val) in self.pars.items() }
+        phi  = cls.getPhiArr(pars, dt, dr, dx, dy, dz)
+
+        # Angles are not needed after cos, so sin overwrites them if the phase law returned own array
+        cos = np.cos(phi)
+        sin = np.sin(phi, out=phi if phi.flags.writeable else None)
+
+        return (cos, sin, rN, rR)
+
+    #--------------------------------------------------------------------------
+    def toArrays(self, arrs, tile, x, y, z, t, chunk=1, sign=1):
+        "Superpose all particles in their order into the tile of amplitude arrays {cAmN, cAmR}, chunk particles at once, sign -1 subtracts them"
+
+        # Tiles are basic slices, so accumulators are views into the amplitude arrays
+        accN = arrs['cAmN'][tile]
+        accR = arrs['cAmR'][tile]
+        add  = np.add if sign > 0 else np.subtract
+
+        # Terms of a particle are divided into one reused complex buffer and added in place,
+        # fresh complex arrays per particle would cost more in page faults than in arithmetic
+        term = None
+
+        for sl in self.getChunks(chunk):
+
+            (cos, sin, rN, rR) = self.getWaves(x, y, z, t, sl)
+            if term is None: term = np.empty(rR.shape[1:], dtype=np.complex128)
+
+            # Particles are added one by one to keep the summation order of partToSpace
+            for i in range(rR.shape[0]):
+                for (acc, r) in ((accN, rN[i]), (accR, rR[i])):
+                    add(acc, waveToAmp(cos[i], sin[i], r, term), out=acc)
+
+#------------------------------------------------------------------------------
+print('PartSet class ver 0.14')
+#==============================================================================
+#                              END OF FILE
+#------------------------------------------------------------------------------
@@ -1,7 +1,12 @@
 #==============================================================================
 # Siqo common library
 #------------------------------------------------------------------------------
-from  datetime import datetime
+from  collections import deque
+import atexit
+import queue
+import sys
+import threading
+import time
 
 #==============================================================================
 # package's constants
@@ -10,7 +15,109 @@ from  datetime import datetime
 #==============================================================================
 # package's tools
 #------------------------------------------------------------------------------
+def formatRecord(rec):
+    "Returns text line for journal record (time, indent, text)"
+    
+    (t, indent, text) = rec
+    return time.strftime('%H:%M:%S ', time.localtime(t)) + indent*'|  ' + text
+
+#==============================================================================
+# Journal sinks
+#------------------------------------------------------------------------------
+class SiqoSinkConsole:
+    "Writes journal records into terminal synchronously"
+    
+    def put(self, rec):
+        print( formatRecord(rec) )
+    
+    def flush(self):
+        sys.stdout.flush()
+    
+    def close(self):
+        self.flush()
 
+#------------------------------------------------------------------------------
+class SiqoSinkRing:
+    "Keeps last size journal records in memory, text lines are formatted only on reading"
+    
+    def __init__(self, size=10000):
+        self.recs = deque(maxlen=size)
+    
+    def put(self, rec):
+        self.recs.append(rec)
+    
+    def lines(self):
+        return [formatRecord(rec) for rec in list(self.recs)]
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        pass
+
+#------------------------------------------------------------------------------
+class SiqoSinkFile:
+    "Writes journal records into file from background thread in batches"
+    
+    def __init__(self, path, batch=1000, interval=0.5, mode='a'):
+        
+        self.path     = path
+        self.batch    = batch     # Max records written by one write call
+        self.interval = interval  # Max seconds a record waits in the queue
+        self.queue    = queue.SimpleQueue()
+        self.file     = open(path, mode)
+        self.thread   = threading.Thread(target=self.run, name='SiqoSinkFile', daemon=True)
+        self.thread.start()
+        
+        atexit.register(self.close)
+    
+    def put(self, rec):
+        self.queue.put(rec)
+    
+    def run(self):
+        "Background loop collecting records from the queue and writing them in batches"
+        
+        done = False
+        while not done:
+            
+            try              : recs = [self.queue.get(timeout=self.interval)]
+            except queue.Empty: continue
+            
+            while len(recs) < self.batch:
+                try              : recs.append(self.queue.get_nowait())
+                except queue.Empty: break
+            
+            # None is a sentinel for close, Event is a marker for flush
+            lines  = []
+            events = []
+            for rec in recs:
+                if   rec is None                     : done = True
+                elif isinstance(rec, threading.Event): events.append(rec)
+                else                                 : lines.append(formatRecord(rec) + '\n')
+            
+            if lines:
+                self.file.write(''.join(lines))
+                self.file.flush()
+            
+            # Flush markers are released only after records put before them are written
+            for ev in events: ev.set()
+    
+    def flush(self):
+        "Waits until all records put so far are written into the file"
+        
+        if not self.thread.is_alive(): return
+        
+        ev = threading.Event()
+        self.queue.put(ev)
+        ev.wait()
+    
+    def close(self):
+        
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        
+        if not self.file.closed: self.file.close()
 
 #==============================================================================
 # Journal
@@ -26,25 +133,189 @@ class SiqoJournal:
         self.name       = name
         self.debugLevel = 10
         self.indent     = 0
+        self.levels     = {}   # Per-module overrides of debugLevel {moduleName: level}
+        self.prof       = None # Root of the span tree when profiling is on
+        self.profStack  = []   # Open spans as [(node, wall start, cpu start)]
+        self.sinks      = [SiqoSinkConsole()]
+    
+    #--------------------------------------------------------------------------
+    def setSinks(self, *sinks):
+        "Sets sinks receiving journal records and returns the previous ones"
+        
+        toret      = self.sinks
+        self.sinks = list(sinks)
+        return toret
     
     #--------------------------------------------------------------------------
-    def M(self, mess, lvl=10 ):
-        "vypise spravu do terminalu"
+    def flush(self):
+        "Flushes all sinks"
         
-        if lvl <= self.debugLevel:
-            print( datetime.now().time().strftime('%H:%M:%S ') + self.indent*'|  ' + mess )
+        for sink in self.sinks: sink.flush()
     
     #--------------------------------------------------------------------------
-    def I(self, mess, lvl=10 ):
+    def setLevel(self, lvl, module=None):
+        "Set debugLevel for the whole journal or override it for one module, None removes the override"
+        
+        if   module is None: self.debugLevel = lvl
+        elif lvl    is None: self.levels.pop(module, None)
+        else               : self.levels[module] = lvl
+    
+    #--------------------------------------------------------------------------
+    def isOn(self, lvl=10, depth=1):
+        "Returns True if message of level lvl from the calling module would be written"
+        
+        # Fast path without module overrides avoids any frame inspection
+        if not self.levels: return lvl <= self.debugLevel
+        
+        module = sys._getframe(depth).f_globals.get('__name__')
+        return lvl <= self.levels.get(module, self.debugLevel)
+    
+    #--------------------------------------------------------------------------
+    def text(self, mess, args):
+        "Returns text of the message, mess may be a format string for args or a callable returning text"
+        
+        if callable(mess): mess = mess(*args)
+        elif args        : mess = mess.format(*args)
+        
+        return mess
+    
+    #--------------------------------------------------------------------------
+    def write(self, mess, args=()):
+        "Puts already accepted message as record (time, indent, text) into all sinks"
+        
+        rec = (time.time(), self.indent, self.text(mess, args))
+        
+        for sink in self.sinks: sink.put(rec)
+    
+    #--------------------------------------------------------------------------
+    def M(self, mess, lvl=10, *args ):
+        "vypise spravu do sinkov, text je formatovany az ked sa sprava naozaj vypise"
+        
+        if self.isOn(lvl, 2):
+            self.write( mess, args )
+    
+    #--------------------------------------------------------------------------
+    def I(self, mess, lvl=10, *args ):
+        
+        if self.isOn(lvl, 2):
+            self.write( mess, args )
         
-        self.M( mess, lvl )
         self.indent += 1
+        
+        if self.prof is not None: self.spanIn(mess)
     
     #--------------------------------------------------------------------------
-    def O(self, mess, lvl=10 ):
+    def O(self, mess, lvl=10, *args ):
     
+        if self.prof is not None: self.spanOut()
+        
         self.indent -= 1
-        self.M( mess, lvl )
+        
+        if self.isOn(lvl, 2):
+            self.write( mess, args )
+    
+    #==========================================================================
+    # Profiler
+    #--------------------------------------------------------------------------
+    def profOn(self):
+        "Starts recording wall time, CPU time and call counts of I/O spans into a new span tree"
+        
+        self.prof      = {'name':self.name, 'count':0, 'wall':0.0, 'cpu':0.0, 'kids':{}}
+        self.profStack = [(self.prof, time.perf_counter(), time.process_time())]
+    
+    #--------------------------------------------------------------------------
+    def profOff(self):
+        "Stops recording and returns the span tree, still open spans are closed at this moment"
+        
+        if self.prof is None: return None
+        
+        while len(self.profStack) > 1: self.spanOut()
+        
+        (root, wall, cpu) = self.profStack.pop()
+        root['count'] = 1
+        root['wall' ] = time.perf_counter() - wall
+        root['cpu'  ] = time.process_time() - cpu
+        
+        toret     = self.prof
+        self.prof = None
+        return toret
+    
+    #--------------------------------------------------------------------------
+    def spanIn(self, mess):
+        "Opens span keyed by the message template under the currently open span"
+        
+        name = mess.__name__ if callable(mess) else mess
+        kids = self.profStack[-1][0]['kids']
+        
+        node = kids.get(name)
+        if node is None:
+            node = {'name':name, 'count':0, 'wall':0.0, 'cpu':0.0, 'kids':{}}
+            kids[name] = node
+        
+        self.profStack.append( (node, time.perf_counter(), time.process_time()) )
+    
+    #--------------------------------------------------------------------------
+    def spanOut(self):
+        "Closes the innermost open span and adds its times into the span tree"
+        
+        # The root span is closed only by profOff, unbalanced O is ignored
+        if len(self.profStack) < 2: return
+        
+        (node, wall, cpu) = self.profStack.pop()
+        
+        node['count'] += 1
+        node['wall' ] += time.perf_counter() - wall
+        node['cpu'  ] += time.process_time() - cpu
+    
+    #--------------------------------------------------------------------------
+    def profSpans(self, node=None, path=()):
+        "Yields (path, node, self wall time) for all spans of the tree in depth-first order"
+        
+        if node is None: node = self.prof
+        if node is None: return
+        
+        path = path + (node['name'],)
+        kids = node['kids'].values()
+        
+        yield (path, node, node['wall'] - sum(kid['wall'] for kid in kids))
+        
+        for kid in kids: yield from self.profSpans(kid, path)
+    
+    #--------------------------------------------------------------------------
+    def profFolded(self, node=None):
+        "Returns span tree as folded stacks 'root;span;span <self wall us>' for flame graph tools"
+        
+        toret = []
+        
+        for (path, span, selfWall) in self.profSpans(node):
+            stack = ';'.join(name.replace(';', ',') for name in path)
+            toret.append( '{} {}'.format(stack, max(int(round(selfWall*1e6)), 0)) )
+        
+        return '\n'.join(toret)
+    
+    #--------------------------------------------------------------------------
+    def profTable(self, node=None):
+        "Returns span tree as plain text table with counts, wall, self wall and CPU times in seconds"
+        
+        toret = ['{:>8} {:>10} {:>10} {:>10}  {}'.format('count', 'wall', 'self', 'cpu', 'span')]
+        
+        for (path, span, selfWall) in self.profSpans(node):
+            toret.append( '{:>8} {:>10.4f} {:>10.4f} {:>10.4f}  {}{}'.format(span['count'], span['wall'],
+                           selfWall, span['cpu'], (len(path)-1)*'|  ', span['name']) )
+        
+        return '\n'.join(toret)
+    
+    #--------------------------------------------------------------------------
+    def profReport(self, path=None):
+        "Stops profiling, prints the table and writes folded stacks into file path if given"
+        
+        root = self.profOff()
+        if root is None: return
+        
+        print( self.profTable(root) )
+        
+        if path is not None:
+            with open(path, 'w') as f: f.write( self.profFolded(root) + '\n' )
   
 #------------------------------------------------------------------------------
 journal = SiqoJournal('Journal')
@@ -56,7 +327,7 @@ journal = SiqoJournal('Journal')
 
 
 #------------------------------------------------------------------------------
-print('Siqo common library ver 1.01')
+print('Siqo common library ver 1.04')
 
 #==============================================================================
 #                              END OF FILE
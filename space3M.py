@@ -10,18 +10,101 @@
 #------------------------------------------------------------------------------
 from siqo_lib      import journal
 from iuniverse_lib import _ERR, _C, _C2
+from partMassLess  import PartMassLess
+from partSet       import PartSet, waveToAmp
 
 from math          import sqrt, exp, sin, cos
 import cmath       as cm
+import numpy       as np
+import os
+import json
+import copy
+import ctypes
+
+from collections        import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing    import shared_memory
 
 #==============================================================================
 # package's constants
 #------------------------------------------------------------------------------
+_TILE_CELL_BYTES = 160     # Estimated peak bytes per cell of the tile in partAmps incl. temporaries
+_SET_BLOCK       = 2**16   # Target number of particle x cell elements superposed at once, fits into CPU cache
+_KERNEL_MEM      = 512e6   # Memory cap of cached kernels in bytes
+_GRID_TOL        = 1e-9    # Max distance of particle from grid point in grid units to use cached kernel
+
+_PLOT_COLUMNS    = ( 'gx', 'gy', 'gz', 'gt', 'x', 'y', 'z', 't', 'reDt', 'imDt', 'abDt', 
+                     'reAmN', 'imAmN', 'abAmN', 'reAmR', 'imAmR', 'abAmR', 'Prob' )
+
+_META_FILE       = 'meta.json'                  # Metadata header of saved space
+_PART_TYPES      = {'MassLess':PartMassLess}    # Particle classes by type for loading saved space
 
 #==============================================================================
 # package's tools
 #-------------------------- ----------------------------------------------------
+def partAmps(part, x, y, z, t):
+    "Return (cAmN, cAmR) complex amplitude arrays of particle for broadcastable real positions x, y, z, t"
+    
+    # One-particle PartSet keeps the same intervals, clamps and phase law as batched partsUp, results agree bit-exactly
+    (cos, sin, rN, rR) = PartSet([part]).getWaves(x, y, z, t)
+    
+    return ( waveToAmp(cos[0], sin[0], rN[0]), waveToAmp(cos[0], sin[0], rR[0]) )
+
+#------------------------------------------------------------------------------
+def tileAxes(axis, tile):
+    "Return tuple of broadcastable real position vectors (x, y, z, t) from axis vectors for given tile"
+    
+    return ( axis['x'][tile[0]].reshape(-1, 1, 1, 1), axis['y'][tile[1]].reshape(1, -1, 1, 1),
+             axis['z'][tile[2]].reshape(1, 1, -1, 1), axis['t'][tile[3]].reshape(1, 1, 1, -1) )
+
+#------------------------------------------------------------------------------
+def partState(part):
+    "Return comparable state of particle which determines its contribution to the space"
+    
+    pos = part.getPos()
+    return ( type(part), tuple(pos[k] for k in 'xyzt'), tuple(sorted(part.getPhiPars().items())) )
 
+#------------------------------------------------------------------------------
+def tileUp(target, axis, psets, chunk, tile):
+    "Superpose particles of the PartSets with signs [(pset, sign)] into the tile of amplitude arrays described by target"
+    
+    # target = ('shm', {key:shared memory name}, dims) or ('npy', {key:path to .npy file}, dims)
+    (typ, src, dims) = target
+    
+    shms = []
+    arrs = {}
+    for key, name in src.items():
+        
+        if typ == 'shm':
+            shm = shared_memory.SharedMemory(name=name)
+            shms.append(shm)
+            arrs[key] = np.ndarray(dims, dtype=np.complex128, buffer=shm.buf)
+        
+        else: arrs[key] = np.load(name, mmap_mode='r+')
+    
+    (x, y, z, t) = tileAxes(axis, tile)
+    for (pset, sign) in psets: pset.toArrays(arrs, tile, x, y, z, t, chunk, sign)
+    
+    if typ == 'npy':
+        for arr in arrs.values(): arr.flush()
+    
+    arrs.clear()
+    for shm in shms: shm.close()
+    
+    return tile
+
+#==============================================================================
+# class SharedBlock
+#------------------------------------------------------------------------------
+class SharedBlock(shared_memory.SharedMemory):
+    "Shared memory block of amplitudes, its handle may be released before arrays created over it"
+
+    #--------------------------------------------------------------------------
+    def __del__(self):
+        "Close the block unless arrays still use it, their export then keeps it mapped until they are released"
+        
+        try               : self.close()
+        except BufferError: pass
 
 #==============================================================================
 # class Space3M
@@ -34,36 +117,66 @@ class Space3M:
     def __init__(self, name):
         "Call constructor of Space3M and initialise it with empty data"
 
-        journal.I( 'Space3M constructor for {}...'.format(name), 10 )
+        journal.I( 'Space3M constructor for {}...', 10, name)
         
         self.name  = name     # unique name for Minkowski space in Your project
         self.shape = {}       # grid's shape as {xMin, xMax, yMin, yMax, zMin, zMax, tMin, tMax}
-        self.base  = {}       # {id:cell}  id='<name>#gx#gy#gz#gt' cell={pos:{}, val:{}, opt:{}}
-        self.blur  = {}       # {id:cell}  id='<name>#gx#gy#gz#gt' cell={pos:{}, val:{}, opt:{}}
+        self.axis  = {}       # {key:vector} key in x, y, z, t, vector is 1D numpy of real positions along the axis
+        self.base  = {}       # {key:array}  key in cDs, cDt, cAmN, cAmR, array is 4D numpy indexed by grid
+        self.blur  = {}       # {key:array}  key in cDs, cDt, cAmN, cAmR, array is 4D numpy indexed by grid
         self.parts = {}       # {'part.name':part} all of particles in space
+        self.applied = {}     # {'part.name':part} snapshots of particles as superposed into active data
+        self.snapped = {}     # {'part.name':pos}  grid points particles were superposed at by partsUpFFT
+        self.kernels = OrderedDict() # {kernelKey:(cAmN, cAmR)} LRU cache of amplitudes of particle in origin
+        self.shms  = {}       # {(typ, key):SharedMemory} blocks of amplitudes kept in RAM, shared with workers
         self.mpg   = 1        # meters  per 1 grid distance
         self.spg   = 1        # seconds per 1 grid distance
+        self.store = None     # directory for disk-backed (memory-mapped) data arrays or None for RAM
+        self.storeMode = 'r+' # 'r' read-only or 'c' copy-on-write store keeps new arrays in RAM
+        self.memBudget = 0    # memory budget in bytes for tiled superposition, 0 means no tiling
         
         self.clear()           # reset all parameters
 
-        journal.O( 'Space3M {} created'.format(self.name), 10 )
+        journal.O( 'Space3M {} created', 10, self.name)
 
     #--------------------------------------------------------------------------
     def clear(self):
         "Clear all data content and set default transformation parameters"
 
         # Vycisti zoznam bodov v oboch dictionaries
+        self.axis.clear()
         self.base.clear()
         self.blur.clear()
+        self.releaseShms()
         self.setAct('base')
         
         self.shape = {'xMin':0, 'xMax':0, 'yMin':0, 'yMax':0, 'zMin':0, 'zMax':0, 'tMin':0, 'tMax':0}
 
         # Vycisti zoznam castic a nastavi zoom
         self.parts.clear()
+        self.applied.clear()
+        self.snapped.clear()
+        self.kernels.clear()
         self.setZoom(1)
 
-        journal.M( 'Space3M {} ALL cleared'.format(self.name), 10)
+        journal.M( 'Space3M {} ALL cleared', 10, self.name)
+        
+    #--------------------------------------------------------------------------
+    def __del__(self):
+        "Release shared memory blocks of amplitudes"
+        
+        self.base.clear()
+        self.blur.clear()
+        self.releaseShms()
+        
+    #--------------------------------------------------------------------------
+    def releaseShms(self):
+        "Unlink shared memory blocks of amplitudes, blocks stay mapped while their arrays are referenced"
+        
+        for shm in self.shms.values(): shm.unlink()
+        
+        # Block is unmapped when both its handle and the last array over it are released
+        self.shms.clear()
         
     #--------------------------------------------------------------------------
     def setAct(self, typ):
@@ -72,14 +185,14 @@ class Space3M:
         if typ == 'base': self.act  = self.base
         if typ == 'blur': self.act  = self.blur
 
-        journal.M( 'Space3M {} set active dictionary: {}'.format(self.name, typ), 10)
+        journal.M( 'Space3M {} set active dictionary: {}', 10, self.name, typ)
         
     #--------------------------------------------------------------------------
     def getActType(self):
         "Get type of active data dictionary"
 
-        if self.act == self.base: return 'base'
-        if self.act == self.blur: return 'blur'
+        if self.act is self.base: return 'base'
+        if self.act is self.blur: return 'blur'
 
     #--------------------------------------------------------------------------
     def shapeMin(self, key='_'):
@@ -107,6 +220,13 @@ class Space3M:
             
         return toret
 
+    #--------------------------------------------------------------------------
+    def getDims(self):
+        "Return dimensions of the 4D data arrays as tuple (nx, ny, nz, nt)"
+        
+        return ( self.shape['xMax'] - self.shape['xMin'], self.shape['yMax'] - self.shape['yMin'],
+                 self.shape['zMax'] - self.shape['zMin'], self.shape['tMax'] - self.shape['tMin'] )
+
     #--------------------------------------------------------------------------
     def setZoom(self, mpg, spg=0):
         "Set meters per grid and seconds per grid parameters"
@@ -116,7 +236,153 @@ class Space3M:
         if spg == 0 : self.spg = mpg / _C
         else        : self.spg = spg
 
-        journal.M( 'Space3M {} setted {} meters_per_grid and {} seconds_per_grid'.format(self.name, self.mpg, self.spg), 10)
+        journal.M( 'Space3M {} setted {} meters_per_grid and {} seconds_per_grid', 10, self.name, self.mpg, self.spg)
+        
+    #--------------------------------------------------------------------------
+    def getAxes(self, tile=(slice(None),)*4):
+        "Return tuple of broadcastable real position vectors (x, y, z, t) for given tile (tuple of slices)"
+        
+        return tileAxes(self.axis, tile)
+
+    #--------------------------------------------------------------------------
+    def getVal(self, key, act=None):
+        "Return 4D array of data dictionary for given key, intervals cDs, cDt are materialized on first request"
+        
+        # act - data dictionary base or blur, None means active one
+        if act is None: act = self.act
+        
+        if key not in act and key in ('cDs', 'cDt'):
+            
+            arr = self.newArray(key, 'base' if act is self.base else 'blur')
+            
+            for tile in self.getTiles(self.memBudget):
+            
+                # Intervals from the origin as in getPosInt(0, pos)
+                (x, y, z, t) = self.getAxes(tile)
+                dr2 = x*x + y*y + z*z
+                dt2 = t*t
+                
+                if key == 'cDs': arr[tile] = np.sqrt( (dr2 - _C2*dt2).astype(np.complex128) )
+                else           : arr[tile] = np.sqrt( (dt2 - dr2/_C2).astype(np.complex128) )
+            
+            # Array is published only when complete, other threads may read active data meanwhile
+            act[key] = arr
+            journal.M( 'Space3M {} getVal materialized {}', 10, self.name, key)
+        
+        return act[key]
+        
+    #--------------------------------------------------------------------------
+    def getStorePath(self, key, typ=None):
+        "Return file path of disk-backed array for given key in data dictionary of type typ, None means active one"
+        
+        if typ is None: typ = self.getActType()
+        
+        return os.path.join(self.store, '{}_{}.npy'.format(typ, key))
+
+    #--------------------------------------------------------------------------
+    def newArray(self, key, typ=None):
+        "Return new zero-filled complex 4D array for given key of data dictionary typ (None is active one) in RAM, shared memory or store"
+        
+        if typ is None: typ = self.getActType()
+        dims = self.getDims()
+        
+        # Amplitudes in RAM live in shared memory, worker processes of partsUp write into them directly
+        if self.store is None and key in ('cAmN', 'cAmR'):
+            
+            size = 16 * int(np.prod(dims))
+            shm  = SharedBlock(create=True, size=max(size, 1))
+            self.shms[(typ, key)] = shm
+            
+            # ctypes view keeps export of the block while the array lives, numpy alone would let close() unmap it
+            return np.ndarray(dims, dtype=np.complex128, buffer=(ctypes.c_byte * size).from_buffer(shm.buf))
+        
+        # Read-only or copy-on-write store (e.g. loaded result) is never written, new arrays are kept in RAM
+        if self.store is None or self.storeMode != 'r+': 
+            return np.zeros(dims, dtype=np.complex128)
+        
+        os.makedirs(self.store, exist_ok=True)
+        return np.lib.format.open_memmap(self.getStorePath(key, typ), mode='w+', dtype=np.complex128, shape=dims)
+
+    #--------------------------------------------------------------------------
+    def isReadOnly(self):
+        "Return True if active data are mapped from read-only store and can't be superposed into"
+        
+        return self.store is not None and self.storeMode == 'r'
+
+    #--------------------------------------------------------------------------
+    def flush(self):
+        "Write memory-mapped arrays of active data to disk and release their resident pages"
+        
+        if self.store is None: return
+        
+        for key, arr in self.act.items():
+            
+            # Arrays materialized in RAM are not mapped, copy-on-write maps would lose their changes
+            if not isinstance(arr, np.memmap) or arr.mode != 'r+': continue
+            
+            arr.flush()
+            
+            # Re-mapping drops pages of the old mapping from process memory
+            self.act[key] = np.load(self.getStorePath(key), mmap_mode=arr.mode)
+            
+    #--------------------------------------------------------------------------
+    def getShareTarget(self):
+        "Return description of active amplitudes for worker processes as in tileUp or None if they can't be shared"
+        
+        dims = self.getDims()
+        
+        if self.store is None:
+            
+            shms = { key:self.shms.get((self.getActType(), key)) for key in ('cAmN', 'cAmR') }
+            if None in shms.values(): return None
+            
+            return ('shm', {key:shm.name for key, shm in shms.items()}, dims)
+        
+        # Read-only and copy-on-write maps are private to this process
+        if self.storeMode != 'r+': return None
+        
+        return ('npy', {key:self.getStorePath(key) for key in ('cAmN', 'cAmR')}, dims)
+        
+    #--------------------------------------------------------------------------
+    def getTiles(self, memBudget=0, axis='x', minTiles=1):
+        "Return list of tiles (tuples of slices) partitioning the grid along axis to fit given memory budget in bytes"
+        
+        dims = self.getDims()
+        ax   = 'xyzt'.index(axis)
+        
+        if memBudget <= 0 and minTiles <= 1: return [ (slice(None),)*4 ]
+        
+        # Number of grid planes along axis fitting into the budget and giving at least minTiles tiles
+        step = -(-dims[ax] // minTiles)
+        
+        if memBudget > 0:
+            plane = _TILE_CELL_BYTES * int(np.prod(dims)) // max(dims[ax], 1)
+            step  = min(step, int(memBudget // max(plane, 1)))
+        
+        step = max(1, step)
+        
+        toret = []
+        for i in range(0, dims[ax], step):
+            
+            tile = [slice(None)] * 4
+            tile[ax] = slice(i, min(i+step, dims[ax]))
+            toret.append( tuple(tile) )
+        
+        return toret
+        
+    #--------------------------------------------------------------------------
+    def getChunk(self, tile, memBudget=0):
+        "Return number of particles superposed at once into the tile, batch stays cache-sized and within memory budget in bytes"
+        
+        dims  = self.getDims()
+        cells = 1
+        for (sl, n) in zip(tile, dims): cells *= len(range(*sl.indices(n)))
+        
+        # Large tiles are already vectorized enough, batching them only adds memory traffic
+        toret = _SET_BLOCK // max(cells, 1)
+        if memBudget > 0: toret = min(toret, int(memBudget // max(_TILE_CELL_BYTES * cells, 1)))
+        
+        return max(1, toret)
         
     #==========================================================================
     # Tools for grid_to_real_position transformations, no data changed or referenced
@@ -173,6 +439,46 @@ class Space3M:
 
     #==========================================================================
     # Tools for cell's selecting, creating & editing
+    #
+    #    cell is addressed by idx as flat row-major index into 4D data arrays,
+    #    idx = ((ix*ny + iy)*nz + iz)*nt + it  where ix = gx - xMin etc.
+    #    string ID '<name>#gx#gy#gz#gt' is used for display only
+    #--------------------------------------------------------------------------
+    def getIdxFromGrid(self, grid):
+        "Return flat index for given grid position or -1 if outside the grid, works also for numpy arrays in grid"
+        
+        (nx, ny, nz, nt) = self.getDims()
+        
+        ix = grid['x'] - self.shape['xMin']
+        iy = grid['y'] - self.shape['yMin']
+        iz = grid['z'] - self.shape['zMin']
+        it = grid['t'] - self.shape['tMin']
+        
+        idx = ((ix*ny + iy)*nz + iz)*nt + it
+        ins = (ix>=0) & (ix<nx) & (iy>=0) & (iy<ny) & (iz>=0) & (iz<nz) & (it>=0) & (it<nt)
+        
+        if np.ndim(idx) == 0: return int(idx) if ins else -1
+        else                : return np.where(ins, idx, -1)
+
+    #--------------------------------------------------------------------------
+    def getGridFromIdx(self, idx):
+        "Return grid position for given flat index, works also for numpy array of indices"
+        
+        (nx, ny, nz, nt) = self.getDims()
+        
+        (rest, it) = divmod(idx,  nt)
+        (rest, iz) = divmod(rest, nz)
+        (ix,   iy) = divmod(rest, ny)
+        
+        return { 'x':ix + self.shape['xMin'], 'y':iy + self.shape['yMin'], 
+                 'z':iz + self.shape['zMin'], 't':it + self.shape['tMin'] }
+
+    #--------------------------------------------------------------------------
+    def getIdxFromPos(self, pos):
+        "Return flat index of the nearest cell for given real position or -1 if outside the grid"
+        
+        return self.getIdxFromGrid( self.getGrid(pos) )
+
     #--------------------------------------------------------------------------
     def getIdFromGrid(self, grid):
         "Create cell's ID from grid position"
@@ -186,6 +492,12 @@ class Space3M:
         grid = self.getGrid(pos)
         return self.getIdFromGrid(grid)
 
+    #--------------------------------------------------------------------------
+    def getIdFromIdx(self, idx):
+        "Create cell's ID from flat index"
+        
+        return self.getIdFromGrid( self.getGridFromIdx(idx) )
+
     #--------------------------------------------------------------------------
     def getIdStruct(self, id):
         "Return ID's structure"
@@ -203,51 +515,103 @@ class Space3M:
             return toret
             
         except:
-            journal.M( 'Space3M {} getIdStruct ERROR id={}'.format(self.name, id), 0)
+            journal.M( 'Space3M {} getIdStruct ERROR id={}', 0, self.name, id)
             return toret
 
     #--------------------------------------------------------------------------
-    def addCellByGrid(self, grid, opt={}):
-        "Create and append cell into active dictionary for given grid position"
+    def getIdxFromId(self, id):
+        "Return flat index for given cell's ID or -1 if ID is invalid or outside the grid"
         
-        pos  = self.getPos(grid)
-        id   = self.getIdFromGrid(grid)
+        rec = self.getIdStruct(id)
+        if rec['name'] == _ERR: return -1
+        
+        return self.getIdxFromGrid( {'x':int(rec['x']), 'y':int(rec['y']), 'z':int(rec['z']), 't':int(rec['t'])} )
+
+    #--------------------------------------------------------------------------
+    def getCell(self, idx, opt={}):
+        "Return cell's view {pos:{}, val:{}, opt:{}} for given flat index into data arrays"
+        
+        i    = np.unravel_index(idx, self.getDims())
+        axis = self.axis
+        pos  = { 'x':float(axis['x'][i[0]]), 'y':float(axis['y'][i[1]]), 'z':float(axis['z'][i[2]]), 't':float(axis['t'][i[3]]) }
+        
+        # Intervals not materialized are computed for this cell only as in addCellByIdx, not for whole grid
         dPos = self.getPosInt(0, pos)
         
         cell = {'pos': pos, 
-                'val': { 'cDs':dPos['cDs'], 'cDt':dPos['cDt'], 'cAmN':complex(0,0), 'cAmR':complex(0,0) },
+                'val': { 'cDs' :complex(self.act['cDs'][i]) if 'cDs' in self.act else dPos['cDs'], 
+                         'cDt' :complex(self.act['cDt'][i]) if 'cDt' in self.act else dPos['cDt'], 
+                         'cAmN':complex(self.act['cAmN'][i]), 'cAmR':complex(self.act['cAmR'][i]) },
                 'opt': opt }
-
-        self.act[id] = cell
         
         return cell
         
+    #--------------------------------------------------------------------------
+    def addCellByIdx(self, idx, opt={}):
+        "Reset cell in active data arrays for given flat index and return its view"
+        
+        if idx < 0:
+            journal.M( 'Space3M {} addCellByIdx ERROR idx={} is outside the shape', 0, self.name, idx)
+            return None
+        
+        i    = np.unravel_index(idx, self.getDims())
+        pos  = self.getPos( self.getGridFromIdx(idx) )
+        dPos = self.getPosInt(0, pos)
+        
+        if 'cDs' in self.act: self.act['cDs'][i] = dPos['cDs']
+        if 'cDt' in self.act: self.act['cDt'][i] = dPos['cDt']
+        
+        self.act['cAmN'][i] = complex(0,0)
+        self.act['cAmR'][i] = complex(0,0)
+        
+        return self.getCell(idx, opt)
+        
+    #--------------------------------------------------------------------------
+    def addCellByGrid(self, grid, opt={}):
+        "Reset cell in active data arrays for given grid position and return its view"
+        
+        return self.addCellByIdx( self.getIdxFromGrid(grid), opt )
+        
     #--------------------------------------------------------------------------
     def addCellById(self, id, opt={}):
-        "Create and append cell into active dictionary for given ID"
+        "Reset cell in active data arrays for given ID and return its view"
         
-        rec  = self.getIdStruct(id)
-        grid = (rec['x'], rec['y'], rec['z'], rec['t'])
-            
-        return self.addCellByGrid(grid, opt)
+        return self.addCellByIdx( self.getIdxFromId(id), opt )
         
+    #--------------------------------------------------------------------------
+    def delCellByIdx(self, idx):
+        "Clear amplitudes of the cell in active data arrays by flat index and return its former view"
+
+        toret = self.getCellByIdx(idx)
+        
+        if toret is not None:
+            i = np.unravel_index(idx, self.getDims())
+            self.act['cAmN'][i] = complex(0,0)
+            self.act['cAmR'][i] = complex(0,0)
+        
+        return toret
+
     #--------------------------------------------------------------------------
     def delCellById(self, id):
-        "Delete permanently cell from active data dictionary by ID"
+        "Clear amplitudes of the cell in active data arrays by ID and return its former view"
 
-        return self.act.pop(id)
+        return self.delCellByIdx( self.getIdxFromId(id) )
 
     #--------------------------------------------------------------------------
-    def getCellById(self, id, opt={}):
-        "Return existing cell by ID or create new cell"
+    def getCellByIdx(self, idx, opt={}):
+        "Return view of existing cell by flat index or None if index is outside the grid"
 
-        try: 
-            toret = self.act[id]
+        if idx < 0 or idx >= np.prod(self.getDims()):
+            journal.M( 'Space3M {} getCellByIdx ERROR idx={} is outside the shape', 0, self.name, idx)
+            return None
         
-        except KeyError:
-            toret = self.addCellById(id, opt)
-        
-        return toret
+        return self.getCell(idx, opt)
+
+    #--------------------------------------------------------------------------
+    def getCellById(self, id, opt={}):
+        "Return view of existing cell by ID or None if ID is outside the grid"
+
+        return self.getCellByIdx( self.getIdxFromId(id), opt )
 
     #==========================================================================
     # Tools for editing of particles
@@ -257,24 +621,86 @@ class Space3M:
         
         self.parts[part.getName()] = part
         
-        journal.M( "Space3M {} added Particle '{}'".format(self.name, part.getName()), 10)
+        journal.M( "Space3M {} added Particle '{}'", 10, self.name, part.getName())
+        
+    #--------------------------------------------------------------------------
+    def delPart(self, name):
+        "Remove particle from space, its contribution is subtracted at next partsUp()"
+        
+        part = self.parts.pop(name, None)
+        
+        if part is None: journal.M( "Space3M {} can't delete Particle '{}'. No such particle", 9, self.name, name)
+        else           : journal.M( "Space3M {} deleted Particle '{}'", 10, self.name, name)
+        
+        return part
+        
+    #--------------------------------------------------------------------------
+    def updPart(self, name, pos=None, eV=None):
+        "Change position and/or energy of particle, its old contribution is replaced by new one at next partsUp()"
+        
+        part = self.parts.get(name)
+        
+        if part is None: 
+            journal.M( "Space3M {} can't update Particle '{}'. No such particle", 9, self.name, name)
+            return None
+        
+        # Position dict is replaced, not changed in place, so snapshots keep old position
+        if pos is not None: part.pos = dict(pos)
+        if eV  is not None: part.setEV(eV)
+        
+        journal.M( "Space3M {} updated Particle '{}'", 10, self.name, name)
+        return part
+        
+    #--------------------------------------------------------------------------
+    def getApplied(self, name):
+        "Return snapshot of particle placed at position its contribution was superposed at"
+        
+        snap = self.applied[name]
+        pos  = self.snapped.get(name)
+        if pos is None: return snap
+        
+        # Snapshot itself keeps real position, so changes of particle are detected against it
+        toret = copy.copy(snap)
+        toret.pos = dict(pos)
+        return toret
         
     #--------------------------------------------------------------------------
-    def printCell(self, id):
-        "Print cell for given ID with their properties"
+    def getDirtyParts(self):
+        "Return tuple (old, new) of particle lists whose contribution has to be subtracted and added to be up to date"
+        
+        # Particles changed since superposition are in both lists, unchanged ones in none of them
+        old = []
+        new = []
+        
+        for name, snap in self.applied.items():
+            part = self.parts.get(name)
+            if part is None or partState(part) != partState(snap): old.append(self.getApplied(name))
         
-        try: 
-            cell = self.act[id]
+        for name, part in self.parts.items():
+            snap = self.applied.get(name)
+            if snap is None or partState(part) != partState(snap): new.append(part)
+        
+        return (old, new)
+        
+    #--------------------------------------------------------------------------
+    def printCell(self, idx):
+        "Print cell for given flat index (or ID) with their properties"
+        
+        if type(idx) == str: idx = self.getIdxFromId(idx)
+        
+        cell = self.getCellByIdx(idx)
+        
+        if cell is not None:
             p = cell['pos']
             v = cell['val']
             
             print('----------------------------------------------------------------------------------------------------')
-            print( "Cell ID = {}".format(id) )
+            print( "Cell ID = {}".format(self.getIdFromIdx(idx)) )
             print( "  x = {:e},                 y = {:e},                 z = {:e}, t = {:e}".format(p['x'], p['y'], p['z'] ,p['t']) )
             print( "cDs = {:e}, cDt = {:e}".format( v['cDs'], v['cDt'] ) )
         
-        except KeyError:
-            journal.M( "Space3M {} can't print cell ID = {}. No such cell".format(self.name, id), 9)
+        else:
+            journal.M( "Space3M {} can't print cell idx = {}. No such cell", 9, self.name, idx)
         
     #--------------------------------------------------------------------------
     def printParts(self):
@@ -292,72 +718,439 @@ class Space3M:
     #==========================================================================
     # Tools for Space initialisation & editing
     #--------------------------------------------------------------------------
-    def createSpace(self, shape, mpg, spg=0 ):
+    def createSpace(self, shape, mpg, spg=0, store=None, memBudget=0 ):
         "Create grid {xMin, xMax, yMin, yMax, zMin, zMax, tMin, tMax} with given meters_per_grid"
         
-        journal.I( 'Space3M {} createSpace...'.format(self.name), 10)
+        # store     - directory for disk-backed data arrays, None keeps data in RAM
+        # memBudget - memory budget in bytes for tiled computation, 0 means whole grid at once
+        
+        journal.I( 'Space3M {} createSpace...', 10, self.name)
 
         self.clear()
         self.setZoom(mpg, spg)
         
-        self.shape = shape
-        journal.M( 'Space3M {} shape is {}'.format(self.name, self.shape), 10)
+        self.shape     = shape
+        self.store     = store
+        self.storeMode = 'r+'
+        self.memBudget = memBudget
+        journal.M( 'Space3M {} shape is {}, store is {}, memory budget is {} B', 10, self.name, self.shape, self.store, self.memBudget)
+        
+        # Axis vectors of real positions, intervals cDs, cDt are materialized lazily in getVal
+        self.axis['x'] = np.arange(shape['xMin'], shape['xMax']) * self.mpg
+        self.axis['y'] = np.arange(shape['yMin'], shape['yMax']) * self.mpg
+        self.axis['z'] = np.arange(shape['zMin'], shape['zMax']) * self.mpg
+        self.axis['t'] = np.arange(shape['tMin'], shape['tMax']) * self.spg
         
-        # Create grid shape
-        i = 0
-        for ix in range(shape['xMin'], shape['xMax']):
-            for iy in range(shape['yMin'], shape['yMax']):
-                for iz in range(shape['zMin'], shape['zMax']):
-                    for it in range(shape['tMin'], shape['tMax']):
-                        
-                        grid = {'x':ix, 'y':iy, 'z':iz, 't':it}
-                        self.addCellByGrid(grid)
-                        i   += 1
+        # Amplitudes are zero-filled on demand by OS (shared memory or sparse file)
+        self.act['cAmN'] = self.newArray('cAmN')
+        self.act['cAmR'] = self.newArray('cAmR')
         
-        journal.O( 'Space3M {} created {} cells'.format(self.name, str(i)), 10)
+        dims = self.getDims()
+        i    = np.prod(dims)
+        
+        journal.O( 'Space3M {} created {} cells', 10, self.name, i)
 
     #--------------------------------------------------------------------------
-    def partToSpace(self, part ):
-        "Append complex amplitude for given particle for every ID in the Space"
+    def partToSpace(self, part, tile=(slice(None),)*4 ):
+        "Append complex amplitude for given particle for every cell in the tile (tuple of slices) of the Space, not tracked by partsUp"
         
-        partPos = part.getPos()
+        act = self.act
         
-        i=0
-        for cell in self.act.values():
-            
-            # ziskanie pootocenia amplitudy
-            dPos = self.getPosInt( partPos, cell['pos'] )
-            phi  = part.getPhi(dPos)
-            cAmp = cm.exp(complex(0,phi))
-            
-            # pokles amplitudy s Nerelativistickou vzdialenostou
-            r    = dPos['dr' ]
-            if r < 1e-1: r = 1e-1
-            cAmpN = cAmp / r
+        (x, y, z, t)   = self.getAxes(tile)
+        (cAmpN, cAmpR) = partAmps( part, x, y, z, t )
         
-            # pokles amplitudy s Relativistickou vzdialenostou
-            r    = abs(dPos['cDt'])
-            if r < 1e-9: r = 1e-9
-            cAmpR = cAmp / r
+        # superpozicia do priestoru
+        act['cAmN'][tile] += cAmpN
+        act['cAmR'][tile] += cAmpR
 
-            # superpozicia do priestoru
-            cell['val']['cAmN'] = cell['val']['cAmN'] + cAmpN
-            cell['val']['cAmR'] = cell['val']['cAmR'] + cAmpR
-            i += 1
-
-        journal.M( 'Space3M {} partToSpace for {} applied for {} cells'.format(self.name, part.getName(), i), 10)
+        journal.M( 'Space3M {} partToSpace for {} applied for {} cells', 10, self.name, part.getName(), cAmpN.size)
 
+    #==========================================================================
+    # Tools for kernel superposition of particles placed on grid points
     #--------------------------------------------------------------------------
-    def partsUp(self):
-        "Call partToSpace() for all praticles in the list"
+    def getPartIdx(self, part, tol=_GRID_TOL):
+        "Return array indices (ix, iy, iz, it) of particle's position if it lies on a grid point inside the grid, else None"
+        
+        # tol - max distance from grid point in grid units, 0.5 snaps any particle to the nearest grid point
+        
+        pos   = part.getPos()
+        dims  = self.getDims()
+        toret = []
+        
+        for (k, step, n) in zip('xyzt', (self.mpg, self.mpg, self.mpg, self.spg), dims):
+            
+            g = pos[k] / step
+            r = int(round(g))
+            i = r - self.shape[k+'Min']
+            
+            if abs(g - r) > tol or i < 0 or i >= n: return None
+            toret.append(i)
+        
+        return tuple(toret)
+    
+    #--------------------------------------------------------------------------
+    def getKernelKey(self, part):
+        "Return key of kernel shared by all particles of the same class and phase law parameters in this grid"
+        
+        # Kernel spans offsets -(n-1)..(n-1) along every axis, so any particle inside the grid can use it
+        return ( type(part), tuple(sorted(part.getPhiPars().items())), self.mpg, self.spg, self.getDims() )
+    
+    #--------------------------------------------------------------------------
+    def getKernelSize(self):
+        "Return number of cells of kernel for this grid"
+        
+        return int(np.prod([2*n - 1 for n in self.getDims()]))
+    
+    #--------------------------------------------------------------------------
+    def getKernelCap(self, memBudget=0):
+        "Return memory cap of cached kernels in bytes, half of memory budget is left for kernels if budget is given"
+        
+        if memBudget <= 0: return _KERNEL_MEM
+        
+        return min(_KERNEL_MEM, memBudget // 2)
+    
+    #--------------------------------------------------------------------------
+    def trimKernels(self, cap, free=0):
+        "Drop least recently used kernels until cached kernels and free bytes fit into cap"
+        
+        while self.kernels and sum(k[0].nbytes + k[1].nbytes for k in self.kernels.values()) + free > cap:
+            self.kernels.popitem(last=False)
+    
+    #--------------------------------------------------------------------------
+    def getKernel(self, part, memBudget=0):
+        "Return cached (cAmN, cAmR) amplitudes of particle placed in origin for all grid offsets, computed on first request"
+        
+        key = self.getKernelKey(part)
+        
+        if key in self.kernels:
+            self.kernels.move_to_end(key)
+            return self.kernels[key]
+        
+        # Room for the new kernel is made before it is allocated
+        self.trimKernels( self.getKernelCap(memBudget), 2 * 16 * self.getKernelSize() )
+        
+        # Particle in origin on offset axes gives the same intervals as particle on any grid point
+        orig = copy.deepcopy(part)
+        orig.pos = {'x':0, 'y':0, 'z':0, 't':0}
+        
+        dims = [2*n - 1 for n in self.getDims()]
+        axis = { k:np.arange(-(n-1), n) * step for (k, n, step) in zip('xyzt', self.getDims(), (self.mpg, self.mpg, self.mpg, self.spg)) }
+        ker  = ( np.empty(dims, dtype=np.complex128), np.empty(dims, dtype=np.complex128) )
+        
+        # Kernel is computed in slabs along x within the part of memory budget not left for kernels
+        step = dims[0] if memBudget <= 0 else max(1, int((memBudget // 2) // (_TILE_CELL_BYTES * int(np.prod(dims[1:])))))
+        
+        for i in range(0, dims[0], step):
+            tile = (slice(i, min(i+step, dims[0])), slice(None), slice(None), slice(None))
+            (ker[0][tile], ker[1][tile]) = partAmps(orig, *tileAxes(axis, tile))
+        
+        self.kernels[key] = ker
+        
+        journal.M( 'Space3M {} getKernel computed kernel of {} cells for {}', 10, self.name, ker[0].size, part.getName())
+        return ker
+    
+    #--------------------------------------------------------------------------
+    def kernelToSpace(self, part, idx, tile=(slice(None),)*4, sign=1, memBudget=0):
+        "Add (sign 1) or subtract (sign -1) shifted kernel of particle on grid indices idx into the tile of the Space"
+        
+        (kerN, kerR) = self.getKernel(part, memBudget)
+        
+        # Cell i gets kernel offset i - idx, which is at kernel index i - idx + (n-1)
+        sel = []
+        for (sl, i, n) in zip(tile, idx, self.getDims()):
+            (start, stop, _) = sl.indices(n)
+            sel.append( slice(start - i + n - 1, stop - i + n - 1) )
+        sel = tuple(sel)
+        
+        if sign > 0:
+            self.act['cAmN'][tile] += kerN[sel]
+            self.act['cAmR'][tile] += kerR[sel]
+        else:
+            self.act['cAmN'][tile] -= kerN[sel]
+            self.act['cAmR'][tile] -= kerR[sel]
+    
+    #--------------------------------------------------------------------------
+    def splitKernelParts(self, old, new, memBudget=0):
+        "Return (old, new, kerOps) where particles superposed by kernels are moved into kerOps [(part, idx, sign)]"
+        
+        # Kernels count against memory budget, cached ones from runs with larger budget are dropped
+        size = self.getKernelSize()
+        cap  = self.getKernelCap(memBudget)
+        self.trimKernels(cap)
+        
+        if 2 * size * 16 > cap: return (old, new, [])
+        
+        # Kernel pays off if it is already cached or if its particles need at least as many cells as the kernel has
+        
+        cells = int(np.prod(self.getDims()))
+        idxs  = {}
+        count = {}
+        
+        for part in old + new:
+            idx = self.getPartIdx(part)
+            if idx is None: continue
+            
+            key = self.getKernelKey(part)
+            idxs[id(part)] = (idx, key)
+            count[key]     = count.get(key, 0) + 1
+        
+        keys   = { key for key, n in count.items() if key in self.kernels or n * cells >= size }
+        kerOps = []
+        rest   = ([], [])
+        
+        for (parts, sign, out) in ((old, -1, rest[0]), (new, 1, rest[1])):
+            for part in parts:
+                rec = idxs.get(id(part))
+                if rec is not None and rec[1] in keys: kerOps.append( (part, rec[0], sign) )
+                else                                 : out.append(part)
+        
+        return (rest[0], rest[1], kerOps)
+    
+    #==========================================================================
+    # Tools for FFT convolution of source densities
+    #--------------------------------------------------------------------------
+    def densityToSpace(self, part, rho, it, sign=1, memBudget=0):
+        "Superpose sources given by density rho (nx, ny, nz) of weights on grid points at time index it, by FFT convolution with kernel of part"
+        
+        # part - template particle whose class and phase law parameters are shared by all sources
+        (kerN, kerR) = self.getKernel(part, memBudget)
+        dims = self.getDims()
+        
+        # Linear convolution of n source cells with 2n-1 kernel offsets needs 3n-2 points without wrap-around
+        size = [3*n - 2 for n in dims[:3]]
+        sel  = tuple( slice(n-1, 2*n-1) for n in dims[:3] )
+        fRho = np.fft.fftn(rho, s=size)
+        
+        # Each time slice is spatial convolution with kernel's time offset t - it, slices are transformed in batches
+        # within the part of memory budget not left for kernels
+        plane = 16 * int(np.prod(size))
+        step  = dims[3] if memBudget <= 0 else max(1, int((memBudget // 2) // (4 * plane)))
+        
+        for t0 in range(0, dims[3], step):
+            
+            t1   = min(t0 + step, dims[3])
+            kers = slice(t0 - it + dims[3] - 1, t1 - it + dims[3] - 1)
+            
+            for (key, ker) in (('cAmN', kerN), ('cAmR', kerR)):
+                
+                fKer = np.fft.fftn(ker[..., kers], s=size, axes=(0, 1, 2))
+                fKer *= fRho[..., np.newaxis]
+                conv = np.fft.ifftn(fKer, axes=(0, 1, 2))[sel]
+                
+                if sign > 0: self.act[key][..., t0:t1] += conv
+                else       : self.act[key][..., t0:t1] -= conv
+        
+        journal.M( 'Space3M {} densityToSpace convolved {} sources at time index {}', 10, self.name, np.count_nonzero(rho), it)
+    
+    #--------------------------------------------------------------------------
+    def rasterParts(self, parts, signs, memBudget=0):
+        "Return (groups, rest, snap, snapped) of particles snapped to nearest grid points as densities {kernelKey:(part, {it:rho})}"
+        
+        # rest    - [(part, sign)] particles to be superposed directly
+        # snap    - max distance of snapped particle from its real position in grid units
+        # snapped - {id(part):pos} real positions of grid points the added particles were snapped to
+        dims    = self.getDims()
+        groups  = {}
+        rest    = []
+        snap    = 0.0
+        snapped = {}
+        
+        # Kernel over memory cap can't be used, all particles are superposed directly
+        if 2 * 16 * self.getKernelSize() > self.getKernelCap(memBudget):
+            return (groups, list(zip(parts, signs)), snap, snapped)
+        
+        for (part, sign) in zip(parts, signs):
+            
+            # Subtracted contributions were applied at their positions, they are snapped only if already on grid point
+            idx = self.getPartIdx(part, 0.5 if sign > 0 else _GRID_TOL)
+            if idx is None:
+                rest.append( (part, sign) )
+                continue
+            
+            pos = part.getPos()
+            grd = {}
+            for (k, step) in zip('xyzt', (self.mpg, self.mpg, self.mpg, self.spg)):
+                g      = round(pos[k]/step)
+                snap   = max(snap, abs(pos[k]/step - g))
+                grd[k] = g * step
+            
+            if sign > 0: snapped[id(part)] = grd
+            
+            key = self.getKernelKey(part)
+            if key not in groups: groups[key] = (part, {})
+            
+            rhos = groups[key][1]
+            if idx[3] not in rhos: rhos[idx[3]] = np.zeros(dims[:3], dtype=np.complex128)
+            rhos[idx[3]][idx[:3]] += sign
+        
+        return (groups, rest, snap, snapped)
+    
+    #--------------------------------------------------------------------------
+    def partsUpFFT(self, memBudget=None, check=0):
+        "Bring superposition of particles up to date by FFT convolution of their densities, particles are snapped to grid points"
+        
+        # check - number of random cells compared with direct evaluation, 0 means no check
+        
+        if memBudget is None: memBudget = self.memBudget
+        
+        if self.isReadOnly():
+            journal.M( "Space3M {} partsUpFFT ERROR store {} is read-only, load it with mode 'r+' or 'c'", 0, self.name, self.store)
+            return None
+        
+        (old, new) = self.getDirtyParts()
+        
+        if not old and not new:
+            journal.M( 'Space3M {} partsUpFFT has nothing to do', 10, self.name)
+            return self.checkParts(check) if check > 0 else None
+        
+        journal.I( 'Space3M {} partsUpFFT subtracts {} and adds {} particles...', 10, self.name, len(old), len(new))
+        
+        (groups, rest, snap, snapped) = self.rasterParts(old + new, [-1]*len(old) + [1]*len(new), memBudget)
+        
+        for (part, rhos) in groups.values():
+            for (it, rho) in rhos.items(): self.densityToSpace(part, rho, it, memBudget=memBudget)
+        
+        # Particles not rasterized are superposed directly, within the rest of memory budget if kernels were used
+        if rest:
+            
+            dirBudget = memBudget - self.getKernelCap(memBudget) if groups and memBudget > 0 else memBudget
+            psets     = [ (PartSet([part for (part, s) in rest if s == sign]), sign) for sign in (-1, 1) ]
+            
+            for tile in self.getTiles(dirBudget):
+                
+                chunk = self.getChunk(tile, dirBudget)
+                for (pset, sign) in psets: pset.toArrays(self.act, tile, *self.getAxes(tile), chunk, sign)
+                
+                self.flush()
+        
+        self.flush()
+        
+        # Grid points of snapped particles are kept apart from snapshots, so either partsUp path removes exactly what was added
+        for snap in old: 
+            del self.applied[snap.getName()]
+            self.snapped.pop(snap.getName(), None)
+        
+        for part in new:
+            self.applied[part.getName()] = copy.deepcopy(part)
+            if id(part) in snapped: self.snapped[part.getName()] = snapped[id(part)]
+        
+        journal.O( 'Space3M {} partsUpFFT done with {} densities, {} particles directly, max snap {:.3f} grid', 10, 
+                   self.name, sum(len(rhos) for (p, rhos) in groups.values()), len(rest), snap)
+        
+        if check > 0: return self.checkParts(check)
+        
+    #--------------------------------------------------------------------------
+    def checkParts(self, samples=1000, seed=0):
+        "Return agreement {cells, errN, errR} of active amplitudes with direct evaluation of particles in random cells"
+        
+        # errN, errR - max abs difference relative to max abs amplitude of directly evaluated cells
+        dims = self.getDims()
+        rng  = np.random.default_rng(seed)
+        idx  = rng.choice(int(np.prod(dims)), size=min(samples, int(np.prod(dims))), replace=False)
+        grid = np.unravel_index(idx, dims)
+        
+        pos  = [ self.axis[k][g] for (k, g) in zip('xyzt', grid) ]
+        dirN = np.zeros(len(idx), dtype=np.complex128)
+        dirR = np.zeros(len(idx), dtype=np.complex128)
         
-        journal.I( 'Space3M {} partsUp...'.format(self.name), 10)
-
         for part in self.parts.values():
-
-            self.partToSpace(part)
+            (cAmN, cAmR) = partAmps(part, *pos)
+            dirN += cAmN
+            dirR += cAmR
+        
+        errN = np.abs(self.act['cAmN'][grid] - dirN).max() / max(np.abs(dirN).max(), 1e-300)
+        errR = np.abs(self.act['cAmR'][grid] - dirR).max() / max(np.abs(dirR).max(), 1e-300)
+        
+        journal.M( 'Space3M {} checkParts in {} cells gives relative error {:.3e} for cAmN and {:.3e} for cAmR', 10, self.name, len(idx), errN, errR)
+        
+        return {'cells':len(idx), 'errN':float(errN), 'errR':float(errR)}
+    
+    #--------------------------------------------------------------------------
+    def partsUp(self, memBudget=None, axis='x', workers=1):
+        "Bring superposition of particles up to date, contributions of changed or deleted particles are replaced or subtracted"
+        
+        # memBudget - memory budget in bytes, None uses budget given in createSpace, 0 means whole grid at once
+        # axis      - axis to split the grid along, 'x' gives contiguous tiles in disk-backed store
+        # workers   - number of worker processes, 1 means serial run in this process
+        
+        if memBudget is None: memBudget = self.memBudget
+        
+        if self.isReadOnly():
+            journal.M( "Space3M {} partsUp ERROR store {} is read-only, load it with mode 'r+' or 'c'", 0, self.name, self.store)
+            return
+        
+        # Copy-on-write store keeps changes private to this process, workers would write into its files
+        if workers > 1 and self.getShareTarget() is None:
+            journal.M( "Space3M {} partsUp runs serially, active amplitudes can't be shared by workers", 9, self.name)
+            workers = 1
+        
+        (old, new) = self.getDirtyParts()
+        
+        if not old and not new:
+            journal.M( 'Space3M {} partsUp has nothing to do', 10, self.name)
+            return
+        
+        # Particles on grid points sharing a kernel are superposed by shifted kernels, others directly
+        (oldDir, newDir, kerOps) = self.splitKernelParts(old, new, memBudget)
+        
+        # Old contributions are subtracted first, new ones are added in order of particles
+        psets = [(PartSet(oldDir), -1), (PartSet(newDir), 1)]
+        
+        # Kernels take their half of memory budget, tiles of direct superposition the rest
+        kerBudget = memBudget
+        if kerOps and memBudget > 0: memBudget = memBudget - self.getKernelCap(memBudget)
+        
+        if workers > 1: 
+            self.partsUpParallel(memBudget, axis, workers, psets)
             
-        journal.O( 'Space3M {} partsUp done'.format(self.name), 10)
+            for (part, idx, sign) in kerOps: self.kernelToSpace(part, idx, sign=sign, memBudget=kerBudget)
+            self.flush()
+            
+        else:
+            tiles = self.getTiles(memBudget, axis)
+            journal.I( 'Space3M {} partsUp in {} tiles along {}...', 10, self.name, len(tiles), axis)
+    
+            for tile in tiles:
+                
+                chunk = self.getChunk(tile, memBudget)
+                for (pset, sign) in psets: pset.toArrays(self.act, tile, *self.getAxes(tile), chunk, sign)
+                for (part, idx, sign) in kerOps: self.kernelToSpace(part, idx, tile, sign, kerBudget)
+                
+                journal.M( 'Space3M {} partsUp tile {} subtracted {} and added {} particles directly, {} by kernels', 10, 
+                           self.name, tile, len(oldDir), len(newDir), len(kerOps))
+                
+                self.flush()
+                
+            journal.O( 'Space3M {} partsUp done', 10, self.name)
+        
+        # Snapshots are copies, later changes of particles are detected against them
+        for snap in old: 
+            del self.applied[snap.getName()]
+            self.snapped.pop(snap.getName(), None)
+        
+        for part in new: self.applied[part.getName()] = copy.deepcopy(part)
+
+    #--------------------------------------------------------------------------
+    def partsUpParallel(self, memBudget, axis, workers, psets):
+        "Superpose PartSets with signs [(pset, sign)] by pool of worker processes, each worker writes its tiles into shared arrays"
+        
+        # Every worker keeps its share of memory budget and every cell sums particles in the same
+        # order as in serial partsUp, so results are identical
+        tiles = self.getTiles(memBudget // workers, axis, minTiles=2*workers)
+        chunk = self.getChunk(tiles[0], memBudget // workers)
+        
+        journal.I( 'Space3M {} partsUpParallel in {} tiles along {} by {} workers...', 10, self.name, len(tiles), axis, workers)
+
+        # Workers write directly into shared memory blocks or memory-mapped files of the store, nothing is copied
+        self.flush()
+        target = self.getShareTarget()
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for tile in pool.map(tileUp, [target]*len(tiles), [self.axis]*len(tiles), [psets]*len(tiles), [chunk]*len(tiles), tiles):
+                journal.M( 'Space3M {} partsUpParallel tile {} done', 10, self.name, tile)
+        
+        self.flush()
+        journal.O( 'Space3M {} partsUpParallel done', 10, self.name)
 
     #==========================================================================
     # Tools for data extraction & persistency
@@ -367,16 +1160,96 @@ class Space3M:
         
         json = []
         
-        for id, cell in self.act.items():
-            json.append(cell)
+        for idx in range(np.prod(self.getDims())):
+            json.append(self.getCell(idx))
         
-        journal.M( 'Space3M {} getJson created {} records'.format(self.name, len(json)), 10)
+        journal.M( 'Space3M {} getJson created {} records', 10, self.name, len(json))
         
         return json
         
+    #--------------------------------------------------------------------------
+    def save(self, path):
+        "Save whole space into directory as raw .npy arrays and metadata header"
+        
+        journal.I( 'Space3M {} save into {}...', 10, self.name, path)
+        
+        os.makedirs(path, exist_ok=True)
+        
+        act  = self.getActType()
+        meta = { 'name' :self.name,  'shape':self.shape, 'mpg':self.mpg, 'spg':self.spg, 'act':act,
+                 'parts':[part.getJson() for part in self.parts.values()],
+                 'applied':[snap.getJson() for snap in self.applied.values()], 'snapped':self.snapped,
+                 'base' :list(self.base.keys()), 'blur':list(self.blur.keys()) }
+        
+        # Arrays are stored in the same layout as disk-backed store
+        for typ in ('base', 'blur'):
+            
+            self.setAct(typ)
+            for key, arr in self.act.items():
+                
+                file = os.path.join(path, '{}_{}.npy'.format(typ, key))
+                
+                if isinstance(arr, np.memmap) and arr.mode == 'r+' and os.path.samefile(self.store, path): arr.flush()
+                else:
+                    # File may be mapped by this space (copy-on-write load), it is replaced, never truncated
+                    np.save(file + '.tmp.npy', arr)
+                    os.replace(file + '.tmp.npy', file)
+            
+        self.setAct(act)
+        
+        with open(os.path.join(path, _META_FILE), 'w') as f: json.dump(meta, f, indent=2)
+            
+        journal.O( 'Space3M {} saved', 10, self.name)
+        
+    #--------------------------------------------------------------------------
+    def load(self, path, mode='r'):
+        "Load space saved in directory, arrays are memory-mapped and paged in on access"
+        
+        # mode - 'r' for read-only browsing, 'r+' for further computing in place,
+        #        'c' for computing in RAM copy-on-write, saved files are not changed
+        
+        journal.I( 'Space3M load from {}...', 10, path)
+        
+        with open(os.path.join(path, _META_FILE)) as f: meta = json.load(f)
+        
+        self.clear()
+        self.name = meta['name']
+        self.setZoom(meta['mpg'], meta['spg'])
+        
+        self.shape = meta['shape']
+        self.store = path
+        self.storeMode = mode
+        
+        self.axis['x'] = np.arange(self.shape['xMin'], self.shape['xMax']) * self.mpg
+        self.axis['y'] = np.arange(self.shape['yMin'], self.shape['yMax']) * self.mpg
+        self.axis['z'] = np.arange(self.shape['zMin'], self.shape['zMax']) * self.mpg
+        self.axis['t'] = np.arange(self.shape['tMin'], self.shape['tMax']) * self.spg
+        
+        for typ in ('base', 'blur'):
+            
+            self.setAct(typ)
+            for key in meta[typ]: self.act[key] = np.load(self.getStorePath(key), mmap_mode=mode)
+            
+        self.setAct(meta['act'])
+        
+        for rec in meta['parts']:
+            
+            part = _PART_TYPES[rec['type']](rec['name'], rec['pos'], rec['eV'])
+            self.addPart(part)
+        
+        # Spaces saved without snapshots are taken as up to date with their particles
+        for rec in meta.get('applied', meta['parts']):
+            
+            snap = _PART_TYPES[rec['type']](rec['name'], dict(rec['pos']), rec['eV'])
+            self.applied[snap.getName()] = snap
+        
+        self.snapped.update( meta.get('snapped', {}) )
+        
+        journal.O( 'Space3M {} loaded with {} particles', 10, self.name, len(self.parts))
+        
     #--------------------------------------------------------------------------
     def getPlotData(self):
-        "Create and return numpy arrays for plotting from active dictionary"
+        "Return metadata and lazy provider of 4D numpy data columns for plotting from active dictionary"
         
         #----------------------------------------------------------------------
         # Metadata section
@@ -407,75 +1280,90 @@ class Space3M:
                }
         
         #----------------------------------------------------------------------
-        # Data section
-        data = {'gx'   :[], 'gy'   :[],    'gz':[], 'gt'  :[], 
-                'x'    :[], 'y'    :[],    'z' :[], 't'   :[], 
-                'reDt' :[], 'imDt' :[], 'abDt' :[],
-                
-                'reAmN':[], 'imAmN':[], 'abAmN':[], 
-                'reAmR':[], 'imAmR':[], 'abAmR':[], 
+        # Data section, columns are computed on demand
+        data  = PlotData(self)
+        toret = { 'meta':meta, 'data':data }
+        i     = np.prod(self.getDims())
+        
+        #----------------------------------------------------------------------
+        # Aggregation section, axis vectors are ascending
+        for key in ('x', 'y', 'z', 't'):
+            toret['meta'][key]['min'] = float(self.axis[key][ 0])
+            toret['meta'][key]['max'] = float(self.axis[key][-1])
+        
+        journal.M( 'Space3M {} getPlotData created {} records', 10, self.name, i)
+        return toret
+    
+#==============================================================================
+# class PlotData
+#------------------------------------------------------------------------------
+class PlotData:
 
-                'Prob':[] }
+    #==========================================================================
+    # Constructor & utilities
+    #--------------------------------------------------------------------------
+    def __init__(self, space):
+        "Create lazy provider of data columns for active dictionary of given Space3M"
         
-        toret = { 'meta':meta, 'data':data }
+        self.space = space
+        self.act   = space.act    # active dictionary at the time of creation
+        self.cache = {}           # {key:array} already computed columns
         
-        i = 0
-        for id, cell in self.act.items():
-            
-            rec  = self.getIdStruct(id)
-            
-            toret['data']['gx'   ].append(     int(rec['x'   ])      )
-            toret['data']['gy'   ].append(     int(rec['y'   ])      )
-            toret['data']['gz'   ].append(     int(rec['z'   ])      )
-            toret['data']['gt'   ].append(     int(rec['t'   ])      )
-            
-            toret['data']['x'    ].append( cell['pos']['x'   ]       )
-            toret['data']['y'    ].append( cell['pos']['y'   ]       )
-            toret['data']['z'    ].append( cell['pos']['z'   ]       )
-            toret['data']['t'    ].append( cell['pos']['t'   ]       )
-            
-            toret['data']['reDt' ].append( cell['val']['cDt' ].real  )
-            toret['data']['imDt' ].append( cell['val']['cDt' ].imag  )
-            toret['data']['abDt' ].append( abs(cell['val']['cDt'])   )
-            
-            toret['data']['reAmN'].append( cell['val']['cAmN'].real  )
-            toret['data']['imAmN'].append( cell['val']['cAmN'].imag  )
-            toret['data']['abAmN'].append( abs(cell['val']['cAmN'])  )
-            
-            toret['data']['reAmR'].append( cell['val']['cAmR'].real  )
-            toret['data']['imAmR'].append( cell['val']['cAmR'].imag  )
-            toret['data']['abAmR'].append( abs(cell['val']['cAmR'])  )
+    #--------------------------------------------------------------------------
+    def keys(self):
+        "Return list of available column's keys"
+        
+        return list(_PLOT_COLUMNS)
+        
+    #--------------------------------------------------------------------------
+    def __contains__(self, key):
+        
+        return key in _PLOT_COLUMNS
+        
+    #--------------------------------------------------------------------------
+    def __getitem__(self, key):
+        "Return 4D array for column's key, column is computed on first request and cached"
+        
+        if key not in self.cache: 
+            self.cache[key] = self.getColumn(key)
+            journal.M( 'PlotData {} column {} computed', 10, self.space.name, key)
+        
+        return self.cache[key]
+        
+    #--------------------------------------------------------------------------
+    def getColumn(self, key):
+        "Compute 4D array for column's key, grid and position columns are broadcasted views without copy"
+        
+        space = self.space
+        dims  = space.getDims()
+        
+        if key in ('gx', 'gy', 'gz', 'gt'):
             
-            prob = abs(cell['val']['cAmR'])
-            toret['data']['Prob' ].append( prob * prob               )
-            i +=1
+            ax  = 'xyzt'.index(key[1])
+            vec = np.arange( space.shape[key[1]+'Min'], space.shape[key[1]+'Max'] )
+            return np.broadcast_to( vec.reshape([-1 if i == ax else 1 for i in range(4)]), dims )
         
-        #----------------------------------------------------------------------
-        # Aggregation section
-        
-        pX = list(toret['data']['x'])
-        pX.sort()
-        pY = list(toret['data']['y'])
-        pY.sort()
-        pZ = list(toret['data']['z'])
-        pZ.sort()
-        pT = list(toret['data']['t'])
-        pT.sort()
-        
-        toret['meta']['x']['min'] = pX[ 0]
-        toret['meta']['x']['max'] = pX[-1]
-        toret['meta']['y']['min'] = pY[ 0]
-        toret['meta']['y']['max'] = pY[-1]
-        toret['meta']['z']['min'] = pZ[ 0]
-        toret['meta']['z']['max'] = pZ[-1]
-        toret['meta']['t']['min'] = pT[ 0]
-        toret['meta']['t']['max'] = pT[-1]
-        
-        journal.M( 'Space3M {} getPlotData created {} records'.format(self.name, i), 10)
-        return toret
+        if key in ('x', 'y', 'z', 't'): return np.broadcast_to( space.getAxes()['xyzt'.index(key)], dims )
+        
+        # Intervals are materialized into the same dictionary as amplitudes are read from
+        if key == 'reDt' : return space.getVal('cDt', self.act).real
+        if key == 'imDt' : return space.getVal('cDt', self.act).imag
+        if key == 'abDt' : return np.abs(space.getVal('cDt', self.act))
+        
+        if key == 'reAmN': return self.act['cAmN'].real
+        if key == 'imAmN': return self.act['cAmN'].imag
+        if key == 'abAmN': return np.abs(self.act['cAmN'])
+        
+        if key == 'reAmR': return self.act['cAmR'].real
+        if key == 'imAmR': return self.act['cAmR'].imag
+        if key == 'abAmR': return np.abs(self.act['cAmR'])
+        
+        if key == 'Prob' : return np.square(self['abAmR'])
+        
+        raise KeyError(key)
     
 #------------------------------------------------------------------------------
-print('Minkowski space class ver 0.37')
+print('Minkowski space class ver 0.58')
 #==============================================================================
 #                              END OF FILE
 #------------------------------------------------------------------------------
@@ -10,14 +10,23 @@
 #------------------------------------------------------------------------------
 from siqo_lib import journal
 
-#from matplotlib.figure                 import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure                 import Figure
+from matplotlib.backends.backend_agg   import FigureCanvasAgg
 from mpl_toolkits                      import mplot3d
 
-import cmath             as cm
+from collections                       import OrderedDict
+from concurrent.futures                import ThreadPoolExecutor
+
 import numpy             as np
+import threading
 import matplotlib.pyplot as plt
-import tkinter           as tk
+
+# Tk is needed only for interactive window, headless GUI runs on Agg canvas
+try:
+    import tkinter       as tk
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+except ImportError:
+    tk = None
 
 #==============================================================================
 # package's constants
@@ -31,16 +40,43 @@ _FIG_W          = 0.8    # Figure width
 _FIG_H          = 1.0    # Figure height
 
 _SC_RED         = 0.3    # Reduction of z-axe in 3D projection
+_SURF_MAX       = 100    # Maximum number of rows and columns of the surface in 3D projection
+_QUIV_MAX       = 2500   # Target maximum number of arrows in quiver chart
+_LIM_MRG        = 0.05   # Margin of axes limits as part of data range
 
 _BTN_AXE_W      = 0.805  # Axe's buttons start width
 _BTN_AXE_H      = 0.001  # Axe's buttons start height
 
 _BTN_VAL_W      = 0.805  # Value's buttons start width
-_BTN_VAL_H      = 0.12   # Value's buttons start height
+_BTN_VAL_H      = 0.145  # Value's buttons start height
 
 _BTN_DIS_W      = 0.1    # Button's second column width separation
 _BTN_DIS_H      = 0.025  # Button's rows separation
 
+_CACHE_MEM      = 256e6  # Default memory cap for cache of data slices in bytes
+_PREFETCH       = 2      # Number of prefetched slices on each side of the slider's value
+
+#==============================================================================
+# package's tools
+#------------------------------------------------------------------------------
+def getUnitPrefix(rng):
+    "Return tuple (prefix, coeff) of unit prefix and scale coefficient suitable for given range of values"
+    
+    c = ('', 1e+00)
+    
+    if rng > 1e-12 : c = ('p', 1e+12)
+    if rng > 1e-09 : c = ('n', 1e+09)
+    if rng > 1e-06 : c = ('µ', 1e+06)
+    if rng > 1e-03 : c = ('m', 1e+03)
+    if rng > 1e+00 : c = ('',  1e+00)
+    if rng > 1e+03 : c = ('K', 1e-03)
+    if rng > 1e+06 : c = ('M', 1e-06)
+    if rng > 1e+09 : c = ('G', 1e-09)
+    if rng > 1e+12 : c = ('T', 1e-12)
+    
+    return c
+
+
 #==============================================================================
 # class Space3Mgui
 #------------------------------------------------------------------------------
@@ -49,8 +85,10 @@ class Space3Mgui:
     #==========================================================================
     # Constructor & utilities
     #--------------------------------------------------------------------------
-    def __init__(self, space):
-        "Create and show GUI for Minkowski space"
+    def __init__(self, space, cacheMem=_CACHE_MEM, headless=False):
+        "Create and show GUI for Minkowski space, cacheMem is memory cap in bytes for cache of data slices"
+
+        # headless - draw on Agg canvas without Tk window and event loop, GUI is driven by setView()
 
         journal.I( 'Space3Mgui constructor...', 10 )
         
@@ -60,7 +98,7 @@ class Space3Mgui:
         self.space3M = space
         self.title   = self.space3M.name
         
-        self.axes    = {1:'Scatter chart', 2:'Quiver chart', 3:'3D projection', 4:'Line chart'}
+        self.axes    = {1:'Scatter chart', 2:'Quiver chart', 3:'3D projection', 4:'Line chart', 5:'Heatmap chart'}
         self.actAxe  = 1
         
         self.values  = {  1:'x',      2:'y',      3:'z',      4:'t', 
@@ -81,10 +119,53 @@ class Space3Mgui:
         dat  = self.space3M.getPlotData()
         self.meta    = dat['meta']
         self.data    = dat['data']
-        self.reScale()
         
         #----------------------------------------------------------------------
-        # Create output window
+        # LRU cache of data slices with prefetch of neighbouring slider values
+        self.cache      = OrderedDict()   # {sliceKey:(X, Y, U, V)}
+        self.cacheSize  = 0               # actual size of cached slices in bytes
+        self.cacheMem   = cacheMem        # memory cap for cached slices in bytes
+        self.cacheLock  = threading.Lock()
+        self.pending    = {}              # {sliceKey:future} slices being prefetched
+        self.prefetcher = ThreadPoolExecutor(max_workers=1)
+        
+        self.chart      = {}              # actual chart {axe, sel, art, n, bg} for incremental redraw
+        
+        self.sVal       = 0               # actual slider's value
+        self.sLabMap    = None            # slider's label, None in headless GUI
+        
+        #----------------------------------------------------------------------
+        # Create output window or headless canvas
+        
+        if headless: win = self.createCanvas()
+        else       : win = self.createWindow()
+        
+        #----------------------------------------------------------------------
+        # Initialisation
+        
+        self.show()   # Initial drawing
+        journal.O( 'Space3Mgui created for space {}', 10, self.title)
+
+        if win is not None: win.mainloop()       # Start listening for events
+
+    #--------------------------------------------------------------------------
+    def createCanvas(self):
+        "Create figure on Agg canvas of the window's size without any Tk widgets"
+        
+        (self.w, self.h) = (int(v) for v in _WIN.split('x'))
+        
+        self.fig    = Figure(figsize=(self.w*_FIG_W/100, self.h*_FIG_H/100), dpi=_DPI)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax     = self.fig.add_subplot(1,1,1)
+        
+        return None
+
+    #--------------------------------------------------------------------------
+    def createWindow(self):
+        "Create Tk window with figure canvas, buttons and slider, return the window"
+        
+        if tk is None: raise RuntimeError('Space3Mgui needs tkinter for interactive window, use headless=True')
+        
         win = tk.Tk()
         win.title(self.title)
         win.geometry(_WIN)
@@ -174,7 +255,6 @@ class Space3Mgui:
         self.sldS = tk.Scale( win, from_=sMin, to=sMax, resolution=1, orient=tk.HORIZONTAL, length=self.w*0.18, 
                               command=self.onSlider, label="Dimension " )
         self.sldS.place(x=self.w * 0.81, y=self.h * 0.9)
-        self.sVal = 0
         
         self.sLabMap = tk.StringVar()
         self.sLab = tk.Label(win, textvariable = self.sLabMap)
@@ -182,13 +262,7 @@ class Space3Mgui:
         
         self.sLabMap.set("Test")
         
-        #----------------------------------------------------------------------
-        # Initialisation
-        
-        self.show()   # Initial drawing
-        journal.O( 'Space3Mgui created for space {}'.format(self.title), 10 )
-
-        win.mainloop()       # Start listening for events
+        return win
 
     #--------------------------------------------------------------------------
     def sliderShow(self):
@@ -198,45 +272,40 @@ class Space3Mgui:
         val = self.getValByGrid(gv, key)
         uni = self.getDataUnit(key)
         
-        self.sLabMap.set("{} has value {:.3f} {}".format(key, val, uni) )
+        self.sLabText = "{} has value {:.3f} {}".format(key, val, uni)
+        if self.sLabMap is not None: self.sLabMap.set(self.sLabText)
     
     #==========================================================================
     # Tools for figure setting
     #--------------------------------------------------------------------------
-    def reScale(self):
-        "Re-scale all data vectors for better understability"
+    def reScale(self, key):
+        "Return metadata of data column with unit prefix and scale coefficient, chosen on first request and cached"
         
-        journal.I( 'Space3Mgui {} reScale...'.format(self.title), 10 )
-        for key, lst in self.data.items():
-            
-            pL = list(lst)  # Urobim si kopiu listu na pokusy :-)
-            pL.sort()
-                
-            # Najdem vhodny koeficient
-            if pL[-1]-pL[0] > 1e-12 : c = ('p', 1e+12)
-            if pL[-1]-pL[0] > 1e-09 : c = ('n', 1e+09)
-            if pL[-1]-pL[0] > 1e-06 : c = ('µ', 1e+06)
-            if pL[-1]-pL[0] > 1e-03 : c = ('m', 1e+03)
-            if pL[-1]-pL[0] > 1e+00 : c = ('',  1e+00)
-            if pL[-1]-pL[0] > 1e+03 : c = ('K', 1e-03)
-            if pL[-1]-pL[0] > 1e+06 : c = ('M', 1e-06)
-            if pL[-1]-pL[0] > 1e+09 : c = ('G', 1e-09)
-            if pL[-1]-pL[0] > 1e+12 : c = ('T', 1e-12)
-                
-            # Preskalujem udaje
-            for i in range(len(lst)): lst[i] = lst[i] * c[1]
-            self.meta[key]['unit' ] = c[0]
-            self.meta[key]['coeff'] = c[1]
-            
-            journal.M( 'Space3Mgui {} Data list {} was re-scaled by {:e} with preposition {}'.format(self.title, key, c[1], c[0]), 10 )
-                
-        journal.O( 'Space3Mgui {} reScale done'.format(self.title), 10 )
+        meta = self.meta[key]
+        if 'scaled' in meta: return meta
+        
+        # Rozsah udajov z metadat alebo z vektorizovaneho min/max
+        if 'min' not in meta:
+            lst = self.data[key]
+            meta['min'] = float(lst.min())
+            meta['max'] = float(lst.max())
+        
+        c = getUnitPrefix(meta['max'] - meta['min'])
+        
+        # Udaje sa preskaluju az pri zobrazeni v getSliceCol
+        meta['unit'  ] = c[0]
+        meta['coeff' ] = c[1]
+        meta['scaled'] = True
+        
+        journal.M( 'Space3Mgui {} Data column {} will be re-scaled by {:e} with preposition {}', 10, self.title, key, c[1], c[0])
+        
+        return meta
     
     #--------------------------------------------------------------------------
     def getDataUnit(self, key):
         "Return data unit for given data's key"
         
-        return "[{}{}]".format(self.meta[key]['unit'], self.meta[key]['dim' ])
+        return "[{}{}]".format(self.reScale(key)['unit'], self.meta[key]['dim' ])
     
     #--------------------------------------------------------------------------
     def getDataLabel(self, key):
@@ -251,7 +320,7 @@ class Space3Mgui:
         gl = self.meta['g'+key]['max'] - self.meta['g'+key]['min']
         vl = self.meta[    key]['max'] - self.meta[    key]['min']
         
-        return (gv/gl) * vl * self.meta[key]['coeff']
+        return (gv/gl) * vl * self.reScale(key)['coeff']
     
     #--------------------------------------------------------------------------
     def setActValS(self):
@@ -272,112 +341,294 @@ class Space3Mgui:
 
         self.actValS = lst[0]
 
-        journal.M( 'Space3Mgui {} setActValS choose for X={}, Y={}, U={} slider value S = {}'.format(self.title, self.actValX, self.actValY, self.actValU, self.actValS), 10 )
+        journal.M( 'Space3Mgui {} setActValS choose for X={}, Y={}, U={} slider value S = {}', 10, self.title, self.actValX, self.actValY, self.actValU, self.actValS)
+        
+    #--------------------------------------------------------------------------
+    def getSliceCol(self, key, sl):
+        "Return rescaled slice of data column for given key and index tuple, without copy if no rescaling"
+        
+        col = self.data[key][sl]
+        
+        coeff = self.reScale(key)['coeff']
+        
+        if coeff == 1: return col
+        else         : return col * coeff
+        
+    #--------------------------------------------------------------------------
+    def getSliceKey(self, sCut):
+        "Return key of slice cache for actual slider axis, X/Y/U/V selection and given slider value"
+        
+        return (self.actValS, sCut, self.actValX, self.actValY, self.actValU, self.actValV)
+        
+    #--------------------------------------------------------------------------
+    def cutSlice(self, key):
+        "Cut a slice of data for given slice key as 3D lattices in grid order of remaining axes"
+        
+        # Runs also in prefetch thread, so selection is taken from the key and only journal.M is used here
+        (actValS, sCut, actValX, actValY, actValU, actValV) = key
+        
+        sKey = self.values[actValS]
+        xDim = self.values[actValX]
+        yDim = self.values[actValY]
+        uDim = self.values[actValU]
+        vDim = self.values[actValV]
+
+        # Data are on regular grid so the slice is direct index into slider's axis
+        sl = [slice(None)] * 4
+        sl['xyzt'.index(sKey)] = sCut - self.space3M.shapeMin(sKey)
+        sl = tuple(sl)
+        
+        # Cached slices must not hold strided views of the data
+        X = np.ascontiguousarray( self.getSliceCol(xDim, sl) )
+        Y = np.ascontiguousarray( self.getSliceCol(yDim, sl) )
+        U = np.ascontiguousarray( self.getSliceCol(uDim, sl) )
+        V = np.ascontiguousarray( self.getSliceCol(vDim, sl) )
+        
+        journal.M( "Space3Mgui {} cutSlice {}={} gives 4 x {} data points", 10, self.title, sKey, sCut, X.size)
+        
+        return (X, Y, U, V)
+        
+    #--------------------------------------------------------------------------
+    def cacheSlice(self, key, slc):
+        "Insert slice into LRU cache and evict the least recently used slices above memory cap"
+        
+        with self.cacheLock:
+            
+            if key in self.cache: return
+            
+            self.cache[key]  = slc
+            self.cacheSize  += sum(arr.nbytes for arr in slc)
+            
+            while self.cacheSize > self.cacheMem and len(self.cache) > 1:
+                (old, oldSlc)   = self.cache.popitem(last=False)
+                self.cacheSize -= sum(arr.nbytes for arr in oldSlc)
+        
+    #--------------------------------------------------------------------------
+    def prefetch(self):
+        "Cut neighbouring slices of actual slider value into cache in background thread"
+        
+        sKey = self.values[self.actValS]
+        
+        for d in range(1, _PREFETCH+1):
+            for sCut in (self.sVal+d, self.sVal-d):
+                
+                if sCut < self.space3M.shapeMin(sKey) or sCut >= self.space3M.shapeMax(sKey): continue
+                
+                key = self.getSliceKey(sCut)
+                with self.cacheLock:
+                    if key in self.cache or key in self.pending: continue
+                    self.pending[key] = self.prefetcher.submit(self.prefetchSlice, key)
+        
+    #--------------------------------------------------------------------------
+    def prefetchSlice(self, key):
+        "Cut slice and insert it into cache, runs in prefetch thread"
+        
+        try:
+            slc = self.cutSlice(key)
+            self.cacheSlice(key, slc)
+            return slc
+        
+        finally:
+            with self.cacheLock: self.pending.pop(key, None)
         
     #--------------------------------------------------------------------------
     def getDataSlice(self):
-        "Return a slice of data for given actValS"
+        "Return a slice of data for given actValS as 3D lattices in grid order of remaining axes"
         
-        sDim = 'g' + self.values[self.actValS]
+        sKey = self.values[self.actValS]
         sCut = self.sVal
+        key  = self.getSliceKey(sCut)
         
-        journal.I( "Space3Mgui {} getDataSlice will use Dim='{}' with cut={}".format(self.title, sDim, sCut), 10 )
-
-        x = []
-        y = []
-        u = []
-        v = []
-
-        xDim = self.values[self.actValX]
-        yDim = self.values[self.actValY]
-        uDim = self.values[self.actValU]
-        vDim = self.values[self.actValV]
-
-        i = 0
-        for sValue in self.data[sDim]:
+        journal.I( "Space3Mgui {} getDataSlice will use Dim='g{}' with cut={}", 10, self.title, sKey, sCut)
+        
+        with self.cacheLock:
+            toret = self.cache.get(key)
+            fut   = self.pending.get(key)
+            if toret is not None: self.cache.move_to_end(key)
+        
+        if toret is None:
             
-            if sValue == sCut:
-                x.append( self.data[xDim][i] )
-                y.append( self.data[yDim][i] )
-                u.append( self.data[uDim][i] )
-                v.append( self.data[vDim][i] )
-            i += 1
+            if fut is not None: toret = fut.result()
+            else:
+                toret = self.cutSlice(key)
+                self.cacheSlice(key, toret)
+            
+        else: journal.M( "Space3Mgui {} getDataSlice found slice in cache", 10, self.title)
         
-        X = np.array(x)
-        journal.M( "Space3Mgui {} getDataSlice X dimension is {} in <{:.3}, {:.3}>".format(self.title, xDim, X.min(), X.max()), 10 )
-
-        Y = np.array(y)
-        journal.M( "Space3Mgui {} getDataSlice Y dimension is {} in <{:.3}, {:.3}>".format(self.title, yDim, Y.min(), Y.max()), 10 )
-
-        U = np.array(u)
-        journal.M( "Space3Mgui {} getDataSlice U dimension is {} in <{:.3}, {:.3}>".format(self.title, uDim, U.min(), U.max()), 10 )
-
-        V = np.array(v)
-        journal.M( "Space3Mgui {} getDataSlice V dimension is {} in <{:.3}, {:.3}>".format(self.title, vDim, V.min(), V.max()), 10 )
-
-
-        journal.O( "Space3Mgui {} getDataSlice return 4 x {} data points".format(self.title, len(x)), 10 )
+        # Susedne rezy sa pripravia na pozadi
+        self.prefetch()
         
-        return (X, Y, U, V)
+        journal.O( "Space3Mgui {} getDataSlice return 4 x {} data points", 10, self.title, toret[0].size)
+        
+        return toret
         
     #==========================================================================
     # GUI methods
+    #--------------------------------------------------------------------------
+    def getDataLim(self, key):
+        "Return rescaled (min, max) range of whole data column with margin for stable axes limits and colours"
+        
+        meta = self.reScale(key)
+        lo   = meta['min'] * meta['coeff']
+        hi   = meta['max'] * meta['coeff']
+        
+        d = _LIM_MRG * (hi - lo)
+        if d == 0: d = 0.5
+        
+        return (lo - d, hi + d)
+        
     #--------------------------------------------------------------------------
     def show(self):
         "Show Minkovski space according to given parameters"
         
-        journal.I( 'Space3Mgui {} show {}'.format(self.title, self.axes[self.actAxe]), 10 )
-        
-        # Odstranenie vsetkych axes
-        while len(self.fig.axes)>0: self.fig.axes[0].remove()
+        journal.I( 'Space3Mgui {} show {}', 10, self.title, self.axes[self.actAxe])
         
         # Rozhodnutie o slider dimezii
         self.setActValS()
 
         # Vytvorenie rezu udajov na zobrazenie
         (X, Y, U, V) = self.getDataSlice()
+        self.sliderShow()
+    
+        # Existujuce artists sa len aktualizuju, inak sa graf vytvori nanovo
+        if not self.updateChart(X, Y, U, V): self.buildChart(X, Y, U, V)
     
+        journal.O( 'Space3Mgui {} show done', 10, self.title)
+        
+    #--------------------------------------------------------------------------
+    def getChartSel(self):
+        "Return selection of values which determines labels, limits and colours of the chart"
+        
+        return (self.actValX, self.actValY, self.actValU, self.actValV)
+        
+    #--------------------------------------------------------------------------
+    def getChartKind(self):
+        "Return kind of chart to be drawn for active axe, heatmap falls back to scatter if X, Y do not span a single grid plane"
+        
+        if self.actAxe == 5 and self.getRasterAxes() is None: return 1
+        
+        return self.actAxe
+        
+    #--------------------------------------------------------------------------
+    def getRasterAxes(self):
+        "Return positions (ix, iy) of X and Y in the sliced 3D lattice or None if X, Y are not grid's coordinates"
+        
+        sKey = self.values[self.actValS]
+        xKey = self.values[self.actValX]
+        yKey = self.values[self.actValY]
+        
+        rax = [key for key in 'xyzt' if key != sKey]
+        
+        if xKey not in rax or yKey not in rax or xKey == yKey: return None
+        
+        (ix, iy) = (rax.index(xKey), rax.index(yKey))
+        
+        # Remaining third axis of the lattice must be a single plane, otherwise a raster would hide its other planes
+        rKey = rax[3 - ix - iy]
+        if self.space3M.getDims()['xyzt'.index(rKey)] > 1:
+            journal.M( 'Space3Mgui {} dim {} has more than one plane, raster charts fall back to all points', 10, self.title, rKey)
+            return None
+        
+        return (ix, iy)
+        
+    #--------------------------------------------------------------------------
+    def getMesh(self, *arrs):
+        "Return 2D meshes of given 3D lattices with rows along Y and columns along X, X and Y must be grid's axes"
+        
+        (ix, iy) = self.getRasterAxes()
+        
+        # Remaining third axis of the lattice has single grid value
+        sl = [slice(None)] * 3
+        sl[3 - ix - iy] = 0
+        sl = tuple(sl)
+        
+        if ix < iy: return [arr[sl].T for arr in arrs]
+        else      : return [arr[sl]   for arr in arrs]
+        
+    #--------------------------------------------------------------------------
+    def getRaster(self, X, Y, U, pix):
+        "Return (img, extent) raster of U on X, Y lattice binned to at most pix = (width, height) pixels"
+        
+        (img,) = self.getMesh(U)
+        
+        # Grid step in real values
+        (ny, nx) = img.shape
+        (x0, y0) = (X.min(), Y.min())
+        
+        dx = (X.max() - x0) / (nx - 1) if nx > 1 else 1
+        dy = (Y.max() - y0) / (ny - 1) if ny > 1 else 1
+        
+        # Binning to screen resolution, incomplete bins at the end are dropped
+        kx = max(1, -(-nx // max(int(pix[0]), 1)))
+        ky = max(1, -(-ny // max(int(pix[1]), 1)))
+        
+        nx = nx // kx * kx
+        ny = ny // ky * ky
+        
+        if kx > 1 or ky > 1: img = img[:ny, :nx].reshape(ny//ky, ky, nx//kx, kx).mean(axis=(1,3))
+        
+        extent = (x0 - dx/2, x0 + (nx - 0.5)*dx, y0 - dy/2, y0 + (ny - 0.5)*dy)
+        
+        return (img, extent)
+        
+    #--------------------------------------------------------------------------
+    def getQuiverData(self, X, Y, U, V):
+        "Return flat (X, Y, U, V, C) for quiver chart subsampled to at most _QUIV_MAX arrows, C is phase of U + iV"
+        
+        # Rovnaky krok vo vsetkych netrivialnych osiach mriezky
+        dims = sum(1 for n in U.shape if n > 1)
+        k    = 1
+        
+        if dims > 0 and U.size > _QUIV_MAX: k = int(np.ceil( (U.size / _QUIV_MAX) ** (1/dims) ))
+        
+        sl = (slice(None, None, k),) * U.ndim
+        (X, Y, U, V) = [arr[sl].ravel() for arr in (X, Y, U, V)]
+        
+        # Farebna skala podla fazy
+        C = np.arctan2(V, U)
+        
+        return (X, Y, U, V, C)
+        
+    #--------------------------------------------------------------------------
+    def buildChart(self, X, Y, U, V):
+        "Remove all axes and build new chart for given data"
+        
+        kind = self.getChartKind()
+        n    = X.size
+        journal.M( 'Space3Mgui {} buildChart {}', 10, self.title, self.axes[kind])
+        
+        # Odstranenie vsetkych axes
+        while len(self.fig.axes)>0: self.fig.axes[0].remove()
+        
+        # Animated artists are drawn by blitting over cached background
+        anim = self.canvas.supports_blit
+        art  = None
+        pix  = None
+        
         # Priprava novych axes
-        self.sliderShow()
-        valX = self.values[self.actValX]
-        valY = self.values[self.actValY]
-
-        if self.actAxe == 1:    # Scatter plot
-            
-            self.ax = self.fig.add_subplot(1,1,1)
-            self.ax.set_title("{}: {}".format(self.axes[self.actAxe], self.title), fontsize=14)
-            self.ax.grid(True)
-            self.ax.set_xlabel( self.getDataLabel(valX) )
-            self.ax.set_ylabel( self.getDataLabel(valY) )
+        valU = self.values[self.actValU]
+        
+        if kind == 3: self.ax = self.fig.add_subplot(1,1,1, projection='3d')
+        else        : self.ax = self.fig.add_subplot(1,1,1)
+        
+        self.ax.set_title("{}: {}".format(self.axes[kind], self.title), fontsize=14)
+        self.ax.grid(True)
+        
+        if kind == 1:    # Scatter plot
             
-            sctr = self.ax.scatter( x=X, y=Y, c=U, cmap='RdYlBu_r')
-            self.fig.colorbar(sctr, ax=self.ax)
+            (lo, hi) = self.getDataLim(valU)
+            art = self.ax.scatter( x=X.ravel(), y=Y.ravel(), c=U.ravel(), cmap='RdYlBu_r', vmin=lo, vmax=hi, animated=anim)
+            self.fig.colorbar(art, ax=self.ax)
             
-        elif self.actAxe == 2:  # Quiver plot
+        elif kind == 2:  # Quiver plot
             
-            self.ax = self.fig.add_subplot(1,1,1)
-            self.ax.set_title("{}: {}".format(self.axes[self.actAxe], self.title), fontsize=14)
-            self.ax.grid(True)
-            self.ax.set_xlabel( self.getDataLabel(valX) )
-            self.ax.set_ylabel( self.getDataLabel(valY) )
-
-            # Farebna skala podla fazy
-            arr = np.c_[U,V]
-            f   = []
-            for c in arr: f.append(cm.phase(complex(c[0], c[1])) )
-            C = np.array(f)
+            (X, Y, U, V, C) = self.getQuiverData(X, Y, U, V)
             
             # Vykreslenie axes
-            quiv = self.ax.quiver( X, Y, U, V, C, cmap='RdYlBu_r' )
-            self.fig.colorbar(quiv, ax=self.ax)
+            art = self.ax.quiver( X, Y, U, V, C, cmap='RdYlBu_r', clim=(-np.pi, np.pi), animated=anim )
+            self.fig.colorbar(art, ax=self.ax)
             
-        elif self.actAxe == 3:  # 3D projection
-            
-            self.ax = self.fig.add_subplot(1,1,1, projection='3d')
-            self.ax.set_title("{}: {}".format(self.axes[self.actAxe], self.title), fontsize=14)
-            self.ax.grid(True)
-            self.ax.set_xlabel( self.getDataLabel(valX) )
-            self.ax.set_ylabel( self.getDataLabel(valY) )
+        elif kind == 3:  # 3D projection
             
             # Reduction z-axis 
             a = U.min()
@@ -385,27 +636,143 @@ class Space3Mgui:
             dr = _SC_RED * (b-a)
             self.ax.set_zlim(a-dr, b+dr)
             
-            # Vykreslenie axes
-            surf = self.ax.plot_trisurf( X, Y, U, linewidth=0.2, cmap='RdYlBu_r', antialiased=False)
+            # Vykreslenie axes, regular grid is drawn as structured surface without triangulation
+            if self.getRasterAxes() is not None:
+                
+                (X, Y, U) = self.getMesh(X, Y, U)
+                surf = self.ax.plot_surface( X, Y, U, rcount=min(_SURF_MAX, U.shape[0]), ccount=min(_SURF_MAX, U.shape[1]), 
+                                             linewidth=0.2, cmap='RdYlBu_r', antialiased=False)
+            
+            else:
+                (X, Y, U) = [arr.ravel() for arr in (X, Y, U)]
+                surf = self.ax.plot_trisurf( X, Y, U, linewidth=0.2, cmap='RdYlBu_r', antialiased=False)
+            
             self.fig.colorbar(surf, ax=self.ax)
         
-        elif self.actAxe == 4:  # Line plot
+        elif kind == 4:  # Line plot
+            
+            (art,) = self.ax.plot( X.ravel(), Y.ravel(), animated=anim)
         
-            self.ax = self.fig.add_subplot(1,1,1)
-            self.ax.set_title("{}: {}".format(self.axes[self.actAxe], self.title), fontsize=14)
-            self.ax.grid(True)
-            self.ax.set_xlabel( self.getDataLabel(valX) )
-            self.ax.set_ylabel( self.getDataLabel(valY) )
+        elif kind == 5:  # Heatmap
+            
+            # Raster is binned to pixel size of the axes
+            bbox = self.ax.get_window_extent()
+            pix  = (bbox.width, bbox.height)
+            
+            (img, extent) = self.getRaster(X, Y, U, pix)
+            (lo,  hi    ) = self.getDataLim(valU)
             
-            self.ax.plot( X, Y)
+            art = self.ax.imshow( img, origin='lower', extent=extent, aspect='auto', interpolation='nearest', 
+                                  cmap='RdYlBu_r', vmin=lo, vmax=hi, animated=anim )
+            self.fig.colorbar(art, ax=self.ax)
         
-        else: journal.M( 'Space3Mgui {} show error: Unknown axe {}'.format(self.title, self.actAxe), 10 )
+        else: journal.M( 'Space3Mgui {} show error: Unknown axe {}', 10, self.title, self.actAxe)
+        
+        self.chart = {'axe':self.actAxe, 'kind':kind, 'sel':None, 'art':art, 'n':n, 'pix':pix, 'bg':None}
+        self.setChartSel()
         
         # Vykreslenie noveho grafu
         self.fig.tight_layout()
-        self.canvas.draw()
-    
-        journal.O( 'Space3Mgui {} show done'.format(self.title), 10 )
+        self.drawChart(True)
+        
+    #--------------------------------------------------------------------------
+    def setChartSel(self):
+        "Set labels, limits and colour range of existing chart for actual selection of values"
+        
+        valX = self.values[self.actValX]
+        valY = self.values[self.actValY]
+        valU = self.values[self.actValU]
+        
+        self.ax.set_xlabel( self.getDataLabel(valX) )
+        self.ax.set_ylabel( self.getDataLabel(valY) )
+        
+        if self.chart['kind'] not in (3, 5):
+            self.ax.set_xlim( self.getDataLim(valX) )
+            self.ax.set_ylim( self.getDataLim(valY) )
+        
+        if self.chart['kind'] in (1, 5): 
+            self.chart['art'].set_clim( self.getDataLim(valU) )
+        
+        self.chart['sel'] = self.getChartSel()
+        
+    #--------------------------------------------------------------------------
+    def updateChart(self, X, Y, U, V):
+        "Update data of existing chart's artists, return False if chart must be built again"
+        
+        chart = self.chart
+        kind  = self.getChartKind()
+        
+        if not chart or chart['axe'] != self.actAxe or chart['kind'] != kind or chart['art'] is None or chart['n'] != X.size: return False
+        
+        # Heatmap's extent depends on selection of X, Y
+        if kind == 5 and chart['sel'][:2] != self.getChartSel()[:2]: return False
+        
+        journal.M( 'Space3Mgui {} updateChart {}', 10, self.title, self.axes[kind])
+        
+        art = chart['art']
+        
+        if   kind == 1:  # Scatter plot
+            art.set_offsets( np.c_[X.ravel(), Y.ravel()] )
+            art.set_array( U.ravel() )
+            
+        elif kind == 2:  # Quiver plot
+            (X, Y, U, V, C) = self.getQuiverData(X, Y, U, V)
+            art.set_offsets( np.c_[X, Y] )
+            art.set_UVC( U, V, C )
+            
+        elif kind == 4:  # Line plot
+            art.set_data( X.ravel(), Y.ravel() )
+            
+        elif kind == 5:  # Heatmap
+            art.set_data( self.getRaster(X, Y, U, chart['pix'])[0] )
+        
+        # Zmena vyberu hodnot vyzaduje prekreslenie celeho grafu
+        full = chart['sel'] != self.getChartSel()
+        if full: self.setChartSel()
+        
+        self.drawChart(full)
+        return True
+        
+    #--------------------------------------------------------------------------
+    def drawChart(self, full):
+        "Draw chart on canvas, animated artist is blitted over cached background if full redraw is not needed"
+        
+        art = self.chart['art']
+        
+        if art is None or not art.get_animated():
+            self.canvas.draw()
+            return
+        
+        if full or self.chart['bg'] is None:
+            self.canvas.draw()
+            self.chart['bg'] = self.canvas.copy_from_bbox(self.ax.bbox)
+        
+        else: self.canvas.restore_region(self.chart['bg'])
+        
+        self.ax.draw_artist(art)
+        self.canvas.blit(self.ax.bbox)
+        
+    #--------------------------------------------------------------------------
+    def setView(self, axe=None, valX=None, valY=None, valU=None, valV=None, sVal=None):
+        "Set chart kind, values (keys of self.values) and slider's value, not given ones are kept, and show it"
+        
+        if axe  is not None: self.actAxe  = axe
+        if valX is not None: self.actValX = valX
+        if valY is not None: self.actValY = valY
+        if valU is not None: self.actValU = valU
+        if valV is not None: self.actValV = valV
+        
+        # Slider's value outside the grid of the slider's dimension is refused as in onSlider
+        if sVal is not None:
+            
+            self.setActValS()
+            key = self.values[self.actValS]
+            
+            if sVal < self.space3M.shapeMin(key) or sVal >= self.space3M.shapeMax(key):
+                journal.M( 'Space3Mgui {} setView: {} is outside grid for dim {}', 10, self.title, sVal, key)
+            else: self.sVal = sVal
+        
+        self.show()
         
     #--------------------------------------------------------------------------
     def onButAxe(self):
@@ -452,7 +819,7 @@ class Space3Mgui:
         # Check if new slider's value is applicable
         if newS < self.space3M.shapeMin(key) or newS >= self.space3M.shapeMax(key):
             
-            journal.M( 'Space3Mgui {} onSlider: {} is outside grid for dim {}'.format(self.title, newS, key), 10 )
+            journal.M( 'Space3Mgui {} onSlider: {} is outside grid for dim {}', 10, self.title, newS, key)
             self.sldS.set(self.sVal)
             
         else:
@@ -473,17 +840,17 @@ class Space3Mgui:
             valY = self.values[self.actValY]
             valS = self.values[self.actValS]
             
-            x = x                                  / self.meta[valX]['coeff']
-            y = y                                  / self.meta[valY]['coeff']
-            s = self.getValByGrid(self.sVal, valS) / self.meta[valS]['coeff']
+            x = x                                  / self.reScale(valX)['coeff']
+            y = y                                  / self.reScale(valY)['coeff']
+            s = self.getValByGrid(self.sVal, valS) / self.reScale(valS)['coeff']
             
             pos = {'x':0, 'y':0, 'z':0, 't':0}
             pos[valX] = x
             pos[valY] = y
             pos[valS] = s
             
-            id = self.space3M.getIdFromPos(pos)
-            self.space3M.printCell(id)
+            idx = self.space3M.getIdxFromPos(pos)
+            self.space3M.printCell(idx)
             
         else:
             print('Clicked ouside axes bounds but inside plot window')
@@ -491,7 +858,7 @@ class Space3Mgui:
     #--------------------------------------------------------------------------
 
 #------------------------------------------------------------------------------
-print('Minkowski space class GUI ver 0.34')
+print('Minkowski space class GUI ver 0.45')
 #==============================================================================
 #                              END OF FILE
 #------------------------------------------------------------------------------